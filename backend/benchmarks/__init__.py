@@ -0,0 +1,7 @@
+"""烛龙 - 性能基准
+
+在 backend 目录下运行:
+    python -m benchmarks.micro  [--out micro.json] [--compare 上次.json]
+    python -m benchmarks.load   [--out load.json]  [--compare 上次.json]
+    python -m benchmarks.record   # 把当前信息源录制为 fixtures
+"""
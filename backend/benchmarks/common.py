@@ -0,0 +1,66 @@
+"""烛龙 - 基准结果统计、保存与对比"""
+import json
+import platform
+import statistics
+import sys
+from datetime import datetime
+from pathlib import Path
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    """线性插值百分位 (sorted_values 需已排序)"""
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def summarize(latencies_ms: list[float], elapsed_s: float, errors: int = 0) -> dict:
+    """吞吐量与延迟分布 (毫秒)"""
+    values = sorted(latencies_ms)
+    return {
+        "count": len(values),
+        "errors": errors,
+        "throughput_rps": round(len(values) / elapsed_s, 2) if elapsed_s else 0.0,
+        "mean_ms": round(statistics.fmean(values), 3) if values else 0.0,
+        "p50_ms": round(percentile(values, 50), 3),
+        "p95_ms": round(percentile(values, 95), 3),
+        "p99_ms": round(percentile(values, 99), 3),
+    }
+
+
+def save_results(path: str, kind: str, results: dict) -> None:
+    payload = {
+        "kind": kind,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "results": results,
+    }
+    Path(path).write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"结果已保存: {path}")
+
+
+def print_table(results: dict, previous: dict | None = None) -> None:
+    """打印结果；给出上次结果时附上 p50/p95 变化百分比"""
+    for name, r in results.items():
+        line = (
+            f"{name:<36} n={r['count']:<6} {r['throughput_rps']:>10.1f}/s  "
+            f"p50={r['p50_ms']:.3f}ms p95={r['p95_ms']:.3f}ms p99={r['p99_ms']:.3f}ms"
+        )
+        if r.get("errors"):
+            line += f"  errors={r['errors']}"
+        old = (previous or {}).get(name)
+        if old:
+            for key in ("p50_ms", "p95_ms"):
+                if old[key]:
+                    line += f"  {key[:3]} {(r[key] - old[key]) / old[key] * 100:+.1f}%"
+        print(line)
+
+
+def load_previous(path: str | None) -> dict | None:
+    if not path:
+        return None
+    return json.loads(Path(path).read_text(encoding="utf-8"))["results"]
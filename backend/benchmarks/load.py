@@ -0,0 +1,186 @@
+"""烛龙 - 端到端压测
+
+启动本地 RSS 回放服务 (benchmarks/fixtures/*.xml) 与使用临时 SQLite 的
+uvicorn 子进程，按场景并发请求各接口，输出每个接口的吞吐量与 p50/p95/p99。
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import httpx
+
+from .common import load_previous, print_table, save_results, summarize
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+
+
+def start_fixture_server(fixtures: Path) -> tuple[ThreadingHTTPServer, list[str]]:
+    """回放录制的 RSS，支持 ETag 条件请求"""
+    feeds = {f"/{p.name}": p.read_bytes() for p in sorted(fixtures.glob("*.xml"))}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = feeds.get(self.path)
+            if body is None:
+                self.send_response(404)
+                self.end_headers()
+                return
+            etag = '"' + hashlib.md5(body).hexdigest() + '"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/rss+xml; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", etag)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    return server, [f"http://127.0.0.1:{port}{path}" for path in feeds]
+
+
+def start_app(port: int, db_path: str, feed_urls: list[str]) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite+aiosqlite:///{db_path}",
+        FEED_URLS=json.dumps(feed_urls),
+    )
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app",
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float = 30.0) -> float:
+    """等待服务可用，返回启动耗时 (秒)"""
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        try:
+            if (await client.get("/")).status_code == 200:
+                return time.perf_counter() - start
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.05)
+    raise RuntimeError("服务启动超时")
+
+
+async def run_scenario(client: httpx.AsyncClient, make_request, total: int, concurrency: int) -> dict:
+    """并发执行 total 次请求，make_request(i) 返回 (method, url, kwargs)"""
+    latencies: list[float] = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            method, url, kwargs = make_request(i)
+            t = time.perf_counter()
+            try:
+                resp = await client.request(method, url, **kwargs)
+                if resp.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append((time.perf_counter() - t) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - start, errors)
+
+
+def scenarios(seed_messages: int) -> list[tuple[str, object, float]]:
+    """(名称, 请求生成函数, 请求数占比)"""
+    rng = random.Random(0)
+    senders = ["张总", "李经理", "王秘书", "客户A", "家人"]
+    words = ["今天", "会议", "客户", "合同", "确认", "进度", "周末", "文件", "紧急", "汇报"]
+
+    def msg():
+        return {"sender": rng.choice(senders), "content": "".join(rng.sample(words, 4))}
+
+    return [
+        ("GET /api/contents", lambda i: ("GET", "/api/contents", {}), 1.0),
+        ("GET /api/memos", lambda i: ("GET", "/api/memos", {}), 1.0),
+        ("GET /api/wechat/messages", lambda i: ("GET", "/api/wechat/messages", {}), 1.0),
+        ("GET /api/wechat/messages?priority=urgent",
+         lambda i: ("GET", "/api/wechat/messages", {"params": {"priority": "urgent"}}), 1.0),
+        ("GET /api/search", lambda i: ("GET", "/api/search", {"params": {"q": rng.choice(words)}}), 0.5),
+        ("POST /api/wechat/messages", lambda i: ("POST", "/api/wechat/messages", {"json": msg()}), 1.0),
+        ("POST /api/wechat/messages/bulk[100]",
+         lambda i: ("POST", "/api/wechat/messages/bulk", {"json": [msg() for _ in range(100)]}), 0.1),
+        ("POST /api/memos",
+         lambda i: ("POST", "/api/memos", {"json": {"title": f"备忘 {i}", "content": "压测"}}), 0.5),
+        ("POST /api/contents/refresh", lambda i: ("POST", "/api/contents/refresh", {}), 0.02),
+    ]
+
+
+async def run(args) -> dict:
+    server, feed_urls = start_fixture_server(Path(args.fixtures))
+    tmp = tempfile.mkdtemp(prefix="zhulong-bench-")
+    proc = start_app(args.port, os.path.join(tmp, "bench.db"), feed_urls)
+    results: dict = {}
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{args.port}", timeout=60, limits=limits,
+        ) as client:
+            startup = await wait_ready(client)
+            print(f"服务就绪: {startup:.2f}s")
+
+            # 预置数据
+            for _ in range(args.seed_messages // 500):
+                batch = [{"sender": "预置", "content": f"预置消息 {i} 会议"} for i in range(500)]
+                await client.post("/api/wechat/messages/bulk", json=batch)
+
+            t = time.perf_counter()
+            await client.get("/api/contents")
+            cold = (time.perf_counter() - t) * 1000
+            results["GET /api/contents (首次生成)"] = summarize([cold], cold / 1000)
+
+            for name, make_request, share in scenarios(args.seed_messages):
+                total = max(int(args.requests * share), 1)
+                results[name] = await run_scenario(client, make_request, total, args.concurrency)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+        server.shutdown()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=500, help="每个场景的基准请求数")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seed-messages", type=int, default=5000)
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--fixtures", default=str(FIXTURES_DIR))
+    parser.add_argument("--out", default="bench_load.json")
+    parser.add_argument("--compare", help="上次结果 JSON，用于对比")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print_table(results, load_previous(args.compare))
+    save_results(args.out, "load", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""烛龙 - 微基准：消息分类、相关性打分、ORM -> 模型转换与序列化"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from config import get_settings
+from database import MemoORM, WeChatMessageORM
+from services.info_refinement import calc_relevance
+from services.memo_service import memo_from_orm
+from services.scoring import score_candidates
+from services.wechat_filter import classify_message, message_from_orm
+import response_cache
+
+from .common import load_previous, print_table, save_results, summarize
+
+WORDS = [
+    "今天", "会议", "客户", "合同", "确认", "周末", "吃饭", "文件", "进度", "汇报",
+    "人工智能", "创业", "商业", "佛教", "修行", "视讯", "教育", "融资", "团队", "产品",
+]
+
+
+def _text(rng: random.Random, n: int) -> str:
+    return "".join(rng.choice(WORDS) for _ in range(n))
+
+
+def bench(fn, inputs: list, rounds: int = 5) -> dict:
+    """对每个输入单独计时，返回每次调用的延迟分布"""
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for x in inputs:
+            t = time.perf_counter()
+            fn(x)
+            latencies.append((time.perf_counter() - t) * 1000)
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def run(size: int) -> dict:
+    rng = random.Random(0)
+    settings = get_settings()
+    keywords = settings.interest_keywords
+    weights = {kw.lower(): 1.0 + rng.random() for kw in keywords}
+    now = datetime.utcnow()
+
+    messages = [(_text(rng, 12), f"联系人{i}") for i in range(size)]
+    items = [
+        {"title": _text(rng, 8), "summary": _text(rng, 40), "published": None}
+        for _ in range(size)
+    ]
+    msg_rows = [
+        WeChatMessageORM(
+            id=i, sender=s, content=c, priority="routine",
+            received_at=now - timedelta(minutes=i), is_read=False,
+        )
+        for i, (c, s) in enumerate(messages)
+    ]
+    memo_rows = [
+        MemoORM(
+            id=i, title=_text(rng, 4), content=_text(rng, 20),
+            reminder_at=None, is_completed=False, created_at=now,
+        )
+        for i in range(size)
+    ]
+    msg_models = [message_from_orm(r) for r in msg_rows]
+
+    results = {
+        "classify_message": bench(lambda m: classify_message(*m), messages),
+        "calc_relevance": bench(
+            lambda i: calc_relevance(i["title"], i["summary"], keywords, weights), items,
+        ),
+        f"score_candidates[batch={size}]": bench(
+            lambda batch: score_candidates(batch, keywords, weights), [items],
+        ),
+        "message_from_orm": bench(message_from_orm, msg_rows),
+        "memo_from_orm": bench(memo_from_orm, memo_rows),
+        f"model_dump_json[list={size}]": bench(
+            lambda ms: [m.model_dump(mode="json") for m in ms], [msg_models],
+        ),
+        f"orjson_dumps[list={size}]": bench(response_cache.dumps, [msg_models]),
+    }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=1000, help="每项输入条数")
+    parser.add_argument("--out", default="bench_micro.json")
+    parser.add_argument("--compare", help="上次结果 JSON，用于对比")
+    args = parser.parse_args()
+
+    results = run(args.size)
+    print_table(results, load_previous(args.compare))
+    save_results(args.out, "micro", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""烛龙 - 录制当前信息源为压测 fixtures"""
+import argparse
+import asyncio
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import httpx
+
+from config import get_settings
+from services.info_refinement import DEFAULT_FEEDS
+
+from .load import FIXTURES_DIR
+
+
+async def record(urls: list[str], out_dir: Path) -> None:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    async with httpx.AsyncClient(timeout=30, follow_redirects=True) as client:
+        for url in urls:
+            try:
+                resp = await client.get(url)
+                resp.raise_for_status()
+            except httpx.HTTPError as e:
+                print(f"跳过 {url}: {e}")
+                continue
+            name = urlsplit(url).netloc.replace(".", "_") + ".xml"
+            (out_dir / name).write_bytes(resp.content)
+            print(f"{url} -> {name} ({len(resp.content)} 字节)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--out", default=str(FIXTURES_DIR))
+    args = parser.parse_args()
+    urls = get_settings().feed_urls or DEFAULT_FEEDS
+    asyncio.run(record(urls, Path(args.out)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,20 @@
 """烛龙 - 配置管理"""
 import os
+from typing import Optional
+from pydantic import BaseModel
 from pydantic_settings import BaseSettings
 from functools import lru_cache
 
+DEFAULT_USER = "default"
+
+
+class UserConfig(BaseModel):
+    """多用户模式下单个用户的底层逻辑与兴趣关键词"""
+    identity: str = ""
+    transcendent: str = ""
+    worldly: str = ""
+    interest_keywords: list[str] = []
+
 
 class Settings(BaseSettings):
     """应用配置"""
@@ -11,9 +23,52 @@ class Settings(BaseSettings):
     
     # 数据库 (Railway 等云平台可通过 DATABASE_URL 注入)
     database_url: str = "sqlite+aiosqlite:///./zhulong.db"
+    # 连接池
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    # SQLite 连接参数：performance (WAL 等调优) | default (SQLite 默认)
+    sqlite_profile: str = "performance"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    sqlite_cache_size_kb: int = 20000
+    sqlite_busy_timeout_ms: int = 5000
     
     # 每日推送数量
     daily_push_count: int = 10
+    # 推送日期按该时区切换 (UTC+8)
+    daily_push_utc_offset: int = 8
+    
+    # RSS 抓取 (feed_urls 为空时使用内置信息源)
+    feed_urls: list[str] = []
+    feed_timeout: float = 15.0
+    feed_max_connections: int = 20
+    feed_max_per_host: int = 2
+    feed_entries_per_feed: int = 20
+    # RSS 解析执行方式：process (进程池) | thread (线程池)
+    feed_parse_mode: str = "process"
+    feed_parse_workers: int = 2
+    # 流式下载与增量解析；单个源最多下载的字节数
+    feed_streaming: bool = True
+    feed_max_bytes: int = 2_000_000
+    
+    # 相关性打分：TF-IDF 加权；按发布时间衰减的半衰期 (小时，0 为不衰减)
+    scoring_tfidf: bool = False
+    scoring_half_life_hours: float = 0.0
+    
+    # 合并提交 (write-behind)：启用的表名，如 ["wechat_messages", "memos", "feedbacks"]
+    # 窗口内 (或攒够 max_rows 行) 的插入合并为一个事务
+    write_behind_tables: list[str] = []
+    write_behind_window_ms: float = 5.0
+    write_behind_max_rows: int = 200
+    
+    # 消息分类：发送者重要度 (-1~1) 乘以该系数后与关键词得分相加；画像缓存条数
+    sender_prior_weight: float = 1.0
+    sender_cache_size: int = 5000
+    
+    # 冷数据归档：超过天数的消息/内容/已学习反馈移入 archive_dir (0 为不归档)
+    archive_dir: str = "./archive"
+    archive_after_days: int = 0
+    archive_interval_hours: float = 24.0
     
     # 用户底层逻辑 - 蒋延春
     user_identity: str = "捷视飞通公司(ifreecomm)创始人、董事长、CEO；创业者"
@@ -26,10 +81,31 @@ class Settings(BaseSettings):
         "商业", "捷视飞通", "视讯", "智慧教育", "创业"
     ]
     
+    # 多用户模式：user_id -> UserConfig (USERS 环境变量，JSON)；
+    # 未配置的 default 用户使用上面的单用户配置
+    users: dict[str, UserConfig] = {}
+    
     class Config:
         env_file = ".env"
         extra = "ignore"
 
+    def get_user(self, user_id: str) -> Optional[UserConfig]:
+        """用户配置，用户不存在时返回 None"""
+        if user_id in self.users:
+            return self.users[user_id]
+        if user_id == DEFAULT_USER:
+            return UserConfig(
+                identity=self.user_identity,
+                transcendent=self.user_transcendent,
+                worldly=self.user_worldly,
+                interest_keywords=self.interest_keywords,
+            )
+        return None
+
+    def user_ids(self) -> list[str]:
+        """所有用户 (default 始终在内)"""
+        return [DEFAULT_USER] + [u for u in self.users if u != DEFAULT_USER]
+
 
 def _get_database_url() -> str:
     """优先使用 DATABASE_URL 环境变量（Railway/Heroku 等）"""
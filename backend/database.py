@@ -1,11 +1,12 @@
 """烛龙 - 数据库层"""
 from datetime import datetime
 from typing import Optional
-from sqlalchemy import create_engine, Column, Integer, String, Text, Float, Boolean, DateTime, Enum as SQLEnum
+from sqlalchemy import create_engine, event, Column, Integer, BigInteger, String, Text, Float, Boolean, DateTime, Index, UniqueConstraint, Enum as SQLEnum
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import declarative_base
 
-from config import get_settings
+from config import get_settings, DEFAULT_USER
 
 Base = declarative_base()
 
@@ -13,6 +14,7 @@ Base = declarative_base()
 class ContentORM(Base):
     """推送内容表"""
     __tablename__ = "contents"
+    __table_args__ = (Index("ix_contents_created", "created_at"),)
     id = Column(Integer, primary_key=True, autoincrement=True)
     title = Column(String(500), nullable=False)
     url = Column(String(1000), nullable=False)
@@ -24,20 +26,73 @@ class ContentORM(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
 
+class ContentFingerprintORM(Base):
+    """内容指纹表 (跨天去重：规范化 URL 哈希 + SimHash 分段索引)"""
+    __tablename__ = "content_fingerprints"
+    __table_args__ = (
+        Index("ix_content_fingerprints_band0", "band0"),
+        Index("ix_content_fingerprints_band1", "band1"),
+        Index("ix_content_fingerprints_band2", "band2"),
+        Index("ix_content_fingerprints_band3", "band3"),
+    )
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    content_id = Column(Integer, nullable=False)
+    url_hash = Column(String(40), nullable=False, unique=True)
+    simhash = Column(BigInteger, nullable=True)
+    band0 = Column(Integer, nullable=True)
+    band1 = Column(Integer, nullable=True)
+    band2 = Column(Integer, nullable=True)
+    band3 = Column(Integer, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class DailyBatchORM(Base):
+    """每日推送批次表 (按日期/用户物化，当天重复访问直接读取)"""
+    __tablename__ = "daily_batches"
+    __table_args__ = (UniqueConstraint("batch_date", "user_id"),)
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    batch_date = Column(String(10), nullable=False)  # YYYY-MM-DD
+    user_id = Column(String(50), nullable=False, default="default")
+    content_ids = Column(Text, default="")  # 逗号分隔，按排名顺序
+    scores = Column(Text, default="")  # 逗号分隔，与 content_ids 对应的该用户相关性分数
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class DailyPoolORM(Base):
+    """当日共享候选池 (重启后新增用户直接在池上打分，无需重新抓取)"""
+    __tablename__ = "daily_pools"
+    batch_date = Column(String(10), primary_key=True)  # YYYY-MM-DD
+    items = Column(Text, nullable=False)  # 抓取去重后的候选 (JSON 数组)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
 class FeedbackORM(Base):
     """反馈表"""
     __tablename__ = "feedbacks"
+    __table_args__ = (
+        Index("ix_feedbacks_content", "content_id"),
+        Index("ix_feedbacks_learned", "learned", "id"),
+        Index("ix_feedbacks_created", "created_at"),
+    )
     id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(String(50), nullable=False, default=DEFAULT_USER, server_default=DEFAULT_USER)
     content_id = Column(Integer, nullable=False)
     score = Column(Integer, nullable=False)  # 0-5
     comment = Column(Text, nullable=True)
+    learned = Column(Boolean, default=False)  # 是否已被后台学习任务处理
     created_at = Column(DateTime, default=datetime.utcnow)
 
 
 class MemoORM(Base):
     """备忘录表"""
     __tablename__ = "memos"
+    __table_args__ = (
+        Index("ix_memos_reminder", "is_completed", "reminder_at"),
+        Index("ix_memos_user_open", "user_id", "is_completed", "created_at", "id"),
+        Index("ix_memos_user_created", "user_id", "created_at", "id"),
+    )
     id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(String(50), nullable=False, default=DEFAULT_USER, server_default=DEFAULT_USER)
     title = Column(String(300), nullable=False)
     content = Column(Text, default="")
     reminder_at = Column(DateTime, nullable=True)
@@ -48,7 +103,14 @@ class MemoORM(Base):
 class WeChatMessageORM(Base):
     """微信消息表 (模拟/导入用)"""
     __tablename__ = "wechat_messages"
+    __table_args__ = (
+        Index("ix_wechat_messages_received", "received_at", "id"),
+        Index("ix_wechat_messages_user_received", "user_id", "received_at", "id"),
+        Index("ix_wechat_messages_user_priority", "user_id", "priority", "is_read", "received_at", "id"),
+        Index("ix_wechat_messages_user_unread", "user_id", "is_read", "received_at", "id"),
+    )
     id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(String(50), nullable=False, default=DEFAULT_USER, server_default=DEFAULT_USER)
     sender = Column(String(100), nullable=False)
     content = Column(Text, nullable=False)
     priority = Column(String(20), default="routine")  # urgent, normal, routine
@@ -57,28 +119,93 @@ class WeChatMessageORM(Base):
 
 
 class KeywordWeightORM(Base):
-    """关键词权重表 (用于学习优化)"""
+    """关键词权重表 (用于学习优化，按用户)"""
     __tablename__ = "keyword_weights"
+    __table_args__ = (UniqueConstraint("user_id", "keyword", name="uq_keyword_weights_user_keyword"),)
     id = Column(Integer, primary_key=True, autoincrement=True)
-    keyword = Column(String(100), nullable=False, unique=True)
+    user_id = Column(String(50), nullable=False, default=DEFAULT_USER, server_default=DEFAULT_USER)
+    keyword = Column(String(100), nullable=False)
     weight = Column(Float, default=1.0)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 
+class SenderProfileORM(Base):
+    """发送者画像 (重要度由阅读延迟与手动调整优先级学习得到)"""
+    __tablename__ = "sender_profiles"
+    __table_args__ = (Index("ix_sender_profiles_updated", "updated_at"),)
+    sender = Column(String(200), primary_key=True)
+    importance = Column(Float, nullable=False, default=0.0)  # -1 (不重要) ~ 1 (重要)
+    reads = Column(Integer, nullable=False, default=0)
+    overrides = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class UnreadCounterORM(Base):
+    """各用户、各优先级未读消息数 (随消息写入/已读在同一事务内增减)"""
+    __tablename__ = "unread_counters"
+    user_id = Column(String(50), primary_key=True)
+    priority = Column(String(20), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class SchemaMigrationORM(Base):
+    """已执行的数据库迁移版本 (见 migrations.py)"""
+    __tablename__ = "schema_migrations"
+    version = Column(Integer, primary_key=True, autoincrement=False)
+    description = Column(String(200), default="")
+    applied_at = Column(DateTime, default=datetime.utcnow)
+
+
+def sqlite_pragmas(settings) -> list[str]:
+    """performance 配置下每个 SQLite 连接执行的 PRAGMA"""
+    if settings.sqlite_profile != "performance":
+        return [f"PRAGMA busy_timeout = {int(settings.sqlite_busy_timeout_ms)}"]
+    return [
+        "PRAGMA journal_mode = WAL",  # 读写并发：读不再被写事务阻塞
+        f"PRAGMA synchronous = {settings.sqlite_synchronous}",  # WAL 下 NORMAL 仅在检查点 fsync
+        f"PRAGMA mmap_size = {int(settings.sqlite_mmap_size)}",
+        f"PRAGMA cache_size = -{int(settings.sqlite_cache_size_kb)}",
+        f"PRAGMA busy_timeout = {int(settings.sqlite_busy_timeout_ms)}",
+        "PRAGMA temp_store = MEMORY",
+    ]
+
+
 # 异步数据库引擎
 def get_async_engine():
     settings = get_settings()
-    return create_async_engine(
-        settings.database_url,
-        echo=False
-    )
+    url = settings.database_url
+    parsed = make_url(url)
+    is_sqlite = parsed.get_backend_name() == "sqlite"
+    kwargs = {}
+    if not (is_sqlite and parsed.database in (None, "", ":memory:")):  # 内存库用 StaticPool
+        kwargs.update(pool_size=settings.db_pool_size, max_overflow=settings.db_max_overflow)
+    engine = create_async_engine(url, echo=False, **kwargs)
+
+    if is_sqlite:
+        pragmas = sqlite_pragmas(settings)
+
+        @event.listens_for(engine.sync_engine, "connect")
+        def _set_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for pragma in pragmas:
+                cursor.execute(pragma)
+            cursor.close()
+    return engine
 
 
 async def init_db():
-    """初始化数据库"""
+    """
+    初始化数据库：已是最新版本时不做任何 DDL，
+    否则建表并执行未完成的版本迁移
+    """
+    from migrations import run_migrations, schema_is_current
+
     engine = get_async_engine()
     async with engine.begin() as conn:
+        if await conn.run_sync(schema_is_current):
+            return engine
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(run_migrations)
     return engine
 
 
@@ -1,33 +1,72 @@
 """烛龙 - API 主入口"""
+import time
+
+_import_start = time.perf_counter()
+
+import json
 from contextlib import asynccontextmanager
-from datetime import datetime
+from datetime import date, datetime, timedelta
 
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.requests import HTTPConnection
+from fastapi.responses import PlainTextResponse, StreamingResponse
 
-from config import get_settings
+import metrics
+import response_cache
+from config import get_settings, DEFAULT_USER
 from database import init_db, get_session_factory
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, ValidationError
 from models import (
     ContentFeedback, UserInput, MessagePriority
 )
 from services import (
-    refine_and_rank, record_feedback,
-    create_memo, list_memos, get_pending_reminders, complete_memo, delete_memo,
-    import_message, list_messages, mark_read,
+    record_feedback, close_crawler, get_daily_contents, is_saved, today_key,
+    create_memo, list_memos, get_pending_reminders,
+    complete_memo, complete_memos, delete_memo, delete_memos,
+    get_reminder_scheduler, get_learner, decode_cursor, next_cursor, search,
+    import_message, import_messages, list_messages, BULK_CHUNK_SIZE,
+    mark_read, mark_read_many, mark_all_read, get_unread_counts, rebuild_unread_counts,
+    publish_imported, get_hub, user_topic, MESSAGE_TOPICS, set_priority, get_sender_profiles,
+    get_archiver, archive_old_rows, query_archive, list_partitions, ARCHIVE_TABLES,
+    start_write_buffers, stop_write_buffers,
 )
 
+_import_seconds = time.perf_counter() - _import_start
+
 # 全局引擎和会话
 _engine = None
 _session_factory = None
 
 
+def _archived(counts: dict[str, int]) -> None:
+    response_cache.invalidate("messages", "contents")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     global _engine, _session_factory
-    _engine = await init_db()
+    timer = metrics.StartupTimer()
+    timer.record("imports", _import_seconds)
+    with timer.phase("schema"):
+        _engine = await init_db()
+    metrics.instrument_engine(_engine)
     _session_factory = get_session_factory(_engine)
+    with timer.phase("reminders"):
+        await get_reminder_scheduler().start(_session_factory)
+    with timer.phase("sender_profiles"):
+        await get_sender_profiles().load(_session_factory)
+    with timer.phase("background"):
+        await get_learner().start(_session_factory)
+        await get_archiver().start(_session_factory, on_archived=_archived)
+        start_write_buffers(_session_factory)
+    print(timer.report(), flush=True)
     yield
+    await stop_write_buffers()
+    await get_archiver().stop()
+    await get_learner().stop()
+    await get_reminder_scheduler().stop()
+    await close_crawler()
     if _engine:
         await _engine.dispose()
 
@@ -38,12 +77,14 @@ app = FastAPI(
     version="1.0.0",
     lifespan=lifespan,
 )
+app.add_middleware(metrics.MetricsMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 
@@ -52,77 +93,296 @@ async def get_session():
         yield session
 
 
+def current_user(conn: HTTPConnection) -> str:
+    """
+    当前用户：X-User-Id 请求头，或 user 查询参数 (EventSource/WebSocket 无法设置请求头)，
+    缺省为 default (部署在可信内网，不做鉴权)
+    """
+    user_id = conn.headers.get("x-user-id") or conn.query_params.get("user") or DEFAULT_USER
+    if get_settings().get_user(user_id) is None:
+        raise HTTPException(404, f"未知用户: {user_id}")
+    return user_id
+
+
+def _parse_cursor(cursor: str | None):
+    if not cursor:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+
 # === 用户底层逻辑 ===
 @app.get("/api/user/profile")
-async def get_user_profile():
-    """获取用户底层逻辑"""
-    s = get_settings()
-    return {
-        "identity": s.user_identity,
-        "transcendent": s.user_transcendent,
-        "worldly": s.user_worldly,
-    }
+async def get_user_profile(request: Request, user_id: str = Depends(current_user)):
+    """获取用户底层逻辑 (配置项，进程内不变)"""
+    async def produce():
+        u = get_settings().get_user(user_id)
+        return {
+            "identity": u.identity,
+            "transcendent": u.transcendent,
+            "worldly": u.worldly,
+        }, {"Vary": "X-User-Id"}
+    return await response_cache.cached_response(
+        request, "profile", user_id, produce, cache_control="private, max-age=3600",
+    )
 
 
 # === 信息提炼 ===
 @app.get("/api/contents")
-async def get_contents(session=Depends(get_session)):
+async def get_contents(
+    request: Request, user_id: str = Depends(current_user), session=Depends(get_session)
+):
     """获取今日推送内容 (若今日尚未生成则先生成)"""
-    items = await refine_and_rank(session, limit=get_settings().daily_push_count)
+    async def produce():
+        items = await get_daily_contents(session, user_id)
+        # 抓取失败时的临时结果不缓存，下次请求重新生成
+        return items, {} if is_saved(user_id) else {"Cache-Control": "no-store"}
+    key = f"{today_key()}|{user_id}"
+    return await response_cache.cached_response(request, "contents", key, produce)
+
+
+@app.post("/api/contents/refresh")
+async def refresh_contents(user_id: str = Depends(current_user), session=Depends(get_session)):
+    """重新生成今日推送 (只重排当前用户)"""
+    items = await get_daily_contents(session, user_id, refresh=True)
+    response_cache.invalidate("contents")
     return [i.model_dump(mode="json") for i in items]
 
 
 @app.post("/api/contents/{content_id}/feedback")
-async def submit_feedback(content_id: int, fb: ContentFeedback, session=Depends(get_session)):
+async def submit_feedback(
+    content_id: int, fb: ContentFeedback,
+    user_id: str = Depends(current_user), session=Depends(get_session),
+):
     """提交内容反馈 0-5 分"""
-    await record_feedback(session, content_id, fb.score, fb.comment)
+    await record_feedback(session, content_id, fb.score, fb.comment, user_id)
     return {"ok": True}
 
 
 # === 备忘录 ===
 @app.get("/api/memos")
-async def get_memos(include_completed: bool = False, session=Depends(get_session)):
-    """获取备忘录列表"""
-    items = await list_memos(session, include_completed=include_completed)
-    return [i.model_dump(mode="json") for i in items]
+async def get_memos(
+    request: Request,
+    include_completed: bool = False,
+    cursor: str | None = None,
+    limit: int = Query(50, ge=1, le=200),
+    user_id: str = Depends(current_user),
+    session=Depends(get_session),
+):
+    """获取备忘录列表 (下一页游标见响应头 X-Next-Cursor)"""
+    parsed = _parse_cursor(cursor)
+
+    async def produce():
+        items = await list_memos(
+            session, include_completed=include_completed, limit=limit, cursor=parsed,
+            user_id=user_id,
+        )
+        token = next_cursor(items, limit, "created_at")
+        return items, ({"X-Next-Cursor": token} if token else {})
+    key = f"{user_id}|{include_completed}|{cursor}|{limit}"
+    return await response_cache.cached_response(request, "memos", key, produce)
 
 
 @app.get("/api/memos/reminders")
-async def get_reminders(session=Depends(get_session)):
+async def get_reminders(user_id: str = Depends(current_user), session=Depends(get_session)):
     """获取待提醒项 (提醒模式)"""
-    items = await get_pending_reminders(session)
+    items = await get_pending_reminders(session, user_id)
     return [i.model_dump(mode="json") for i in items]
 
 
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def _sse(kind: str, data) -> str:
+    return f"event: {kind}\ndata: {response_cache.dumps(data).decode()}\n\n"
+
+
+async def _sse_events(sub, backlog=()):
+    """订阅 -> SSE 文本流 (15 秒无事件发一次注释保活)"""
+    hub = get_hub()
+    try:
+        for kind, data in backlog:
+            yield _sse(kind, data)
+        while True:
+            event = await sub.get(timeout=15)
+            if event is None:
+                yield ": ping\n\n"
+                continue
+            yield _sse(event.kind, event.data)
+    finally:
+        hub.unsubscribe(sub)
+
+
+@app.get("/api/memos/reminders/stream")
+async def stream_reminders(user_id: str = Depends(current_user)):
+    """
+    提醒推送 (SSE)：连接时先补发已到期未完成的提醒，之后到点实时推送
+    """
+    sub = get_hub().subscribe([user_topic(user_id, "reminder")])
+    async with _session_factory() as session:
+        backlog = await get_pending_reminders(session, user_id)
+    return StreamingResponse(
+        _sse_events(sub, [("reminder", item) for item in backlog]),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+
 @app.post("/api/memos/{memo_id}/complete")
-async def complete_memo_api(memo_id: int, session=Depends(get_session)):
+async def complete_memo_api(
+    memo_id: int, user_id: str = Depends(current_user), session=Depends(get_session)
+):
     """标记备忘录完成"""
-    ok = await complete_memo(session, memo_id)
+    ok = await complete_memo(session, memo_id, user_id)
     if not ok:
         raise HTTPException(404, "备忘录不存在")
+    get_reminder_scheduler().cancel(memo_id)
+    response_cache.invalidate("memos")
     return {"ok": True}
 
 
 @app.delete("/api/memos/{memo_id}")
-async def delete_memo_api(memo_id: int, session=Depends(get_session)):
+async def delete_memo_api(
+    memo_id: int, user_id: str = Depends(current_user), session=Depends(get_session)
+):
     """删除备忘录"""
-    ok = await delete_memo(session, memo_id)
+    ok = await delete_memo(session, memo_id, user_id)
     if not ok:
         raise HTTPException(404, "备忘录不存在")
+    get_reminder_scheduler().cancel(memo_id)
+    response_cache.invalidate("memos")
     return {"ok": True}
 
 
+class IdList(BaseModel):
+    ids: list[int] = Field(..., max_length=1000)
+
+
+def _memos_changed(ids: list[int]) -> dict:
+    scheduler = get_reminder_scheduler()
+    for memo_id in ids:
+        scheduler.cancel(memo_id)
+    if ids:
+        response_cache.invalidate("memos")
+    return {"count": len(ids), "ids": ids}
+
+
+@app.post("/api/memos/complete")
+async def complete_memos_api(
+    body: IdList, user_id: str = Depends(current_user), session=Depends(get_session)
+):
+    """批量标记完成 (返回实际存在的 id)"""
+    return _memos_changed(await complete_memos(session, body.ids, user_id))
+
+
+@app.post("/api/memos/delete")
+async def delete_memos_api(
+    body: IdList, user_id: str = Depends(current_user), session=Depends(get_session)
+):
+    """批量删除 (返回实际删除的 id)"""
+    return _memos_changed(await delete_memos(session, body.ids, user_id))
+
+
 # === 微信消息过滤 ===
 @app.get("/api/wechat/messages")
 async def get_wechat_messages(
+    request: Request,
     priority: str | None = None,
     unread_only: bool = False,
+    cursor: str | None = None,
+    limit: int = Query(50, ge=1, le=200),
+    user_id: str = Depends(current_user),
     session=Depends(get_session)
 ):
-    """获取微信消息列表"""
+    """获取微信消息列表 (下一页游标见响应头 X-Next-Cursor)"""
     p = MessagePriority(priority) if priority else None
-    items = await list_messages(session, priority=p, unread_only=unread_only)
-    return [i.model_dump(mode="json") for i in items]
+    parsed = _parse_cursor(cursor)
+
+    async def produce():
+        items = await list_messages(
+            session, priority=p, unread_only=unread_only, limit=limit, cursor=parsed,
+            user_id=user_id,
+        )
+        token = next_cursor(items, limit, "received_at")
+        return items, ({"X-Next-Cursor": token} if token else {})
+    key = f"{user_id}|{priority}|{unread_only}|{cursor}|{limit}"
+    return await response_cache.cached_response(request, "messages", key, produce)
+
+
+@app.get("/api/wechat/unread-counts")
+async def unread_counts(
+    request: Request, user_id: str = Depends(current_user), session=Depends(get_session)
+):
+    """各优先级未读数 (角标用)"""
+    async def produce():
+        counts = await get_unread_counts(session, user_id)
+        return {**counts, "total": sum(counts.values())}, {}
+    return await response_cache.cached_response(
+        request, "messages", f"unread-counts|{user_id}", produce,
+    )
+
+
+@app.post("/api/wechat/unread-counts/rebuild")
+async def rebuild_unread_counts_api(
+    user_id: str = Depends(current_user), session=Depends(get_session)
+):
+    """按消息表重新统计未读数 (修复计数偏差；返回当前用户的计数)"""
+    counts = await rebuild_unread_counts(session, user_id)
+    response_cache.invalidate("messages")
+    return {**counts, "total": sum(counts.values())}
+
+
+def _message_topics(priority: list[str] | None, user_id: str) -> list[str]:
+    """订阅的优先级 (默认只订阅紧急)"""
+    topics = [f"message.{p}" for p in (priority or ["urgent"])]
+    unknown = [t for t in topics if t not in MESSAGE_TOPICS]
+    if unknown:
+        raise HTTPException(422, f"未知优先级: {', '.join(t[8:] for t in unknown)}")
+    return [user_topic(user_id, t) for t in topics]
+
+
+@app.get("/api/wechat/stream")
+async def stream_messages(
+    priority: list[str] | None = Query(None), user_id: str = Depends(current_user)
+):
+    """
+    新消息推送 (SSE)，priority 可多选，默认只推送紧急消息。
+    事件：message (单条新消息)、refresh (批量导入，需重新拉取)、
+    overflow (客户端过慢丢了事件，需重新拉取)
+    """
+    sub = get_hub().subscribe(_message_topics(priority, user_id))
+    return StreamingResponse(
+        _sse_events(sub), media_type="text/event-stream", headers=SSE_HEADERS,
+    )
+
+
+@app.websocket("/api/wechat/ws")
+async def messages_ws(websocket: WebSocket):
+    """新消息推送 (WebSocket)，参数与事件同 /api/wechat/stream"""
+    try:
+        user_id = current_user(websocket)
+        topics = _message_topics(websocket.query_params.getlist("priority"), user_id)
+    except HTTPException as e:
+        await websocket.close(code=1008, reason=e.detail)
+        return
+    await websocket.accept()
+    hub = get_hub()
+    sub = hub.subscribe(topics)
+    try:
+        while True:
+            event = await sub.get(timeout=15)
+            if event is None:
+                await websocket.send_text('{"kind": "ping"}')
+                continue
+            await websocket.send_text(response_cache.dumps(
+                {"kind": event.kind, "topic": event.topic, "data": event.data}
+            ).decode())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        hub.unsubscribe(sub)
 
 
 class MemoCreate(BaseModel):
@@ -137,35 +397,221 @@ class WeChatMessageCreate(BaseModel):
     priority: str | None = None
 
 
+class WeChatMessageImport(WeChatMessageCreate):
+    received_at: datetime | None = None
+
+
 @app.post("/api/memos")
-async def add_memo(body: MemoCreate, session=Depends(get_session)):
+async def add_memo(
+    body: MemoCreate, user_id: str = Depends(current_user), session=Depends(get_session)
+):
     """创建备忘录"""
     item = await create_memo(
-        session, body.title, body.content, body.reminder_at
+        session, body.title, body.content, body.reminder_at, user_id
     )
+    get_reminder_scheduler().schedule(item, user_id)
+    response_cache.invalidate("memos")
     return item.model_dump(mode="json")
 
 
 @app.post("/api/wechat/messages")
 async def add_wechat_message(
     body: WeChatMessageCreate,
+    user_id: str = Depends(current_user),
     session=Depends(get_session)
 ):
     """导入微信消息 (供第三方工具调用)"""
     p = MessagePriority(body.priority) if body.priority else None
-    item = await import_message(session, body.sender, body.content, p)
+    item = await import_message(session, body.sender, body.content, p, user_id)
+    response_cache.invalidate("messages")
     return item.model_dump(mode="json")
 
 
+def _parse_import(raw) -> dict:
+    try:
+        body = WeChatMessageImport.model_validate(raw)
+        priority = MessagePriority(body.priority) if body.priority else None
+    except (ValidationError, ValueError) as e:
+        raise HTTPException(422, f"消息格式错误: {e}")
+    return {
+        "sender": body.sender,
+        "content": body.content,
+        "priority": priority,
+        "received_at": body.received_at,
+    }
+
+
+async def _iter_ndjson(request: Request):
+    """逐行解析流式 NDJSON 请求体"""
+    buf = b""
+    async for chunk in request.stream():
+        buf += chunk
+        *lines, buf = buf.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+    if buf.strip():
+        yield json.loads(buf)
+
+
+@app.post("/api/wechat/messages/bulk")
+async def add_wechat_messages_bulk(
+    request: Request, user_id: str = Depends(current_user), session=Depends(get_session)
+):
+    """
+    批量导入微信消息
+    请求体为 JSON 数组，或 Content-Type: application/x-ndjson 的流式逐行 JSON
+    """
+    content_type = request.headers.get("content-type", "")
+    results = []
+    try:
+        if "ndjson" in content_type or "jsonl" in content_type:
+            batch = []
+            async for raw in _iter_ndjson(request):
+                batch.append(_parse_import(raw))
+                if len(batch) >= BULK_CHUNK_SIZE:
+                    results += await import_messages(session, batch, commit=False, user_id=user_id)
+                    batch = []
+            results += await import_messages(session, batch, commit=False, user_id=user_id)
+            await session.commit()
+        else:
+            raw = await request.json()
+            if not isinstance(raw, list):
+                raise HTTPException(422, "请求体应为消息数组")
+            results = await import_messages(
+                session, [_parse_import(r) for r in raw], user_id=user_id,
+            )
+    except json.JSONDecodeError as e:
+        raise HTTPException(400, f"JSON 解析失败: {e}")
+    response_cache.invalidate("messages")
+    publish_imported(results, user_id)
+    return {"count": len(results), "items": results}
+
+
+class MarkReadRequest(BaseModel):
+    """ids 与 priority/cursor 二选一；都不给时全部标记已读"""
+    ids: list[int] | None = Field(None, max_length=1000)
+    priority: str | None = None
+    cursor: str | None = None
+
+
+@app.post("/api/wechat/messages/read")
+async def mark_messages_read(
+    body: MarkReadRequest, user_id: str = Depends(current_user), session=Depends(get_session)
+):
+    """
+    批量标记已读：按 ids，或按优先级/游标 (游标位置及更早的消息) 全部标记
+    返回本次由未读变为已读的 id
+    """
+    if body.ids is not None:
+        ids = await mark_read_many(session, body.ids, user_id)
+    else:
+        try:
+            p = MessagePriority(body.priority) if body.priority else None
+        except ValueError:
+            raise HTTPException(422, f"未知优先级: {body.priority}")
+        ids = await mark_all_read(
+            session, priority=p, up_to=_parse_cursor(body.cursor), user_id=user_id,
+        )
+    if ids:
+        response_cache.invalidate("messages")
+    return {"count": len(ids), "ids": ids}
+
+
 @app.post("/api/wechat/messages/{msg_id}/read")
-async def mark_message_read(msg_id: int, session=Depends(get_session)):
+async def mark_message_read(
+    msg_id: int, user_id: str = Depends(current_user), session=Depends(get_session)
+):
     """标记消息已读"""
-    ok = await mark_read(session, msg_id)
+    ok = await mark_read(session, msg_id, user_id)
     if not ok:
         raise HTTPException(404, "消息不存在")
+    response_cache.invalidate("messages")
     return {"ok": True}
 
 
+class PriorityOverride(BaseModel):
+    priority: MessagePriority
+
+
+@app.post("/api/wechat/messages/{msg_id}/priority")
+async def override_message_priority(
+    msg_id: int, body: PriorityOverride,
+    user_id: str = Depends(current_user), session=Depends(get_session),
+):
+    """手动调整消息优先级 (同时用于学习发送者重要度)"""
+    item = await set_priority(session, msg_id, body.priority, user_id)
+    if item is None:
+        raise HTTPException(404, "消息不存在")
+    response_cache.invalidate("messages")
+    return item.model_dump(mode="json")
+
+
+# === 冷数据归档 ===
+@app.post("/api/archive/run")
+async def run_archive(
+    older_than_days: int | None = Query(None, ge=1),
+    session=Depends(get_session),
+):
+    """立即归档超过天数的消息/内容/已学习反馈 (默认取配置 archive_after_days)"""
+    days = older_than_days or get_settings().archive_after_days
+    if days <= 0:
+        raise HTTPException(400, "未配置归档天数 (archive_after_days)")
+    counts = await archive_old_rows(session, older_than_days=days)
+    _archived(counts)
+    return counts
+
+
+def _archive_kind(kind: str) -> str:
+    if kind not in ARCHIVE_TABLES:
+        raise HTTPException(404, f"未知归档类型: {kind}")
+    return kind
+
+
+@app.get("/api/archive/{kind}/partitions")
+async def archive_partitions(kind: str):
+    """已有的归档分区日期"""
+    return [d.isoformat() for d in list_partitions(_archive_kind(kind))]
+
+
+@app.get("/api/archive/{kind}")
+async def archive_query(
+    kind: str,
+    start: date | None = None,
+    end: date | None = None,
+    q: str | None = None,
+    priority: str | None = None,
+    sender: str | None = None,
+    limit: int = Query(100, ge=1, le=1000),
+    user_id: str = Depends(current_user),
+):
+    """
+    查询归档 (只读，按时间倒序)：kind 为 message / content / feedback，
+    日期范围默认最近 30 天，只扫描范围内的分区；消息和反馈只返回当前用户的
+    """
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=30)
+    owned = {"user_id": user_id} if kind in ("message", "feedback") else {}
+    return await query_archive(
+        _archive_kind(kind), start, end, q=q, limit=limit, priority=priority, sender=sender,
+        **owned,
+    )
+
+
+# === 全文检索 ===
+@app.get("/api/search")
+async def search_api(
+    q: str = Query(..., min_length=1),
+    kind: list[str] | None = Query(None),
+    limit: int = Query(20, ge=1, le=100),
+    user_id: str = Depends(current_user),
+    session=Depends(get_session),
+):
+    """检索备忘录/微信消息/推送内容 (kind 可多选：memo, message, content)"""
+    items = await search(session, q, kinds=kind, limit=limit, user_id=user_id)
+    return [i.model_dump(mode="json") for i in items]
+
+
 # === 自然语言输入 (预留) ===
 @app.post("/api/input")
 async def handle_user_input(input_data: UserInput, session=Depends(get_session)):
@@ -184,6 +630,12 @@ async def handle_user_input(input_data: UserInput, session=Depends(get_session))
     return {"intent": "unknown", "text": input_data.text}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics_api():
+    """Prometheus 指标"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/")
 async def root():
     return {
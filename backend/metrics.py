@@ -0,0 +1,247 @@
+"""烛龙 - 运行指标 (Prometheus 文本格式)
+
+- 每个路由的请求延迟直方图 (ASGI 中间件)
+- 每类 SQL 语句的耗时 (SQLAlchemy 引擎事件)
+- 每个信息源的下载/解析耗时、字节数、错误数 (feed_crawler 上报)
+- 启动各阶段耗时 (StartupTimer)
+
+纯内存计数，无额外依赖，每次观测只是几次字典查找与整数加法。
+"""
+import re
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Iterable
+
+from sqlalchemy import event
+from starlette.routing import Match
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0)
+FEED_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 15.0, 30.0)
+
+_registry: list["_Metric"] = []
+
+
+def _fmt_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        _registry.append(self)
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, labels: tuple[str, ...] = (), amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        for labels, v in self._values.items():
+            lines.append(f"{self.name}{_fmt_labels(self.labelnames, labels)} {v}")
+        return lines
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def set(self, labels: tuple[str, ...], value: float) -> None:
+        self._values[labels] = value
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        for labels, v in self._values.items():
+            lines.append(f"{self.name}{_fmt_labels(self.labelnames, labels)} {v}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [各桶计数..., +Inf 计数, 总和]
+        self._values: dict[tuple[str, ...], list[float]] = {}
+
+    def observe(self, labels: tuple[str, ...], value: float) -> None:
+        row = self._values.get(labels)
+        if row is None:
+            row = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        row[bisect_left(self.buckets, value)] += 1
+        row[-1] += value
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        for labels, row in self._values.items():
+            cumulative = 0
+            for bound, n in zip(self.buckets + ("+Inf",), row[:-1]):
+                cumulative += n
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_fmt_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_fmt_labels(self.labelnames, labels)} {row[-1]}")
+            lines.append(f"{self.name}_count{_fmt_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+def render() -> str:
+    lines: list[str] = []
+    for m in _registry:
+        lines += m.render()
+    return "\n".join(lines) + "\n"
+
+
+# === HTTP ===
+HTTP_LATENCY = Histogram(
+    "zhulong_http_request_duration_seconds", "HTTP 请求耗时",
+    ("method", "route", "status"),
+)
+
+
+class MetricsMiddleware:
+    """ASGI 中间件：按路由模板 (而非实际路径) 记录请求耗时"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_LATENCY.observe(
+                (scope["method"], _route_path(scope), str(status)),
+                time.perf_counter() - start,
+            )
+
+
+def _route_path(scope) -> str:
+    route = scope.get("route")
+    if route is None:
+        # 旧版 Starlette 不写 scope["route"]，自行匹配
+        for r in scope["app"].routes:
+            if r.matches(scope)[0] == Match.FULL:
+                route = r
+                break
+    return getattr(route, "path", "unmatched")
+
+
+# === 数据库 ===
+DB_LATENCY = Histogram(
+    "zhulong_db_statement_duration_seconds", "SQL 语句耗时",
+    ("operation", "table"), buckets=DB_BUCKETS,
+)
+_TABLE_RE = re.compile(r"\b(?:FROM|INTO|UPDATE|TABLE)\s+[\"`]?(\w+)", re.IGNORECASE)
+
+
+def _statement_labels(statement: str) -> tuple[str, str]:
+    op = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "?"
+    m = _TABLE_RE.search(statement)
+    return op, (m.group(1) if m else "")
+
+
+def instrument_engine(engine) -> None:
+    """给 (异步) 引擎挂上语句计时事件"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_metrics_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("_metrics_start")
+        if starts:
+            DB_LATENCY.observe(_statement_labels(statement), time.perf_counter() - starts.pop())
+
+
+# === 信息源 ===
+FEED_FETCH = Histogram(
+    "zhulong_feed_fetch_duration_seconds", "信息源抓取总耗时 (含下载与解析)",
+    ("source",), buckets=FEED_BUCKETS,
+)
+FEED_PARSE = Histogram(
+    "zhulong_feed_parse_duration_seconds", "信息源解析耗时",
+    ("source",), buckets=FEED_BUCKETS,
+)
+FEED_BYTES = Counter("zhulong_feed_bytes_total", "信息源下载字节数", ("source",))
+FEED_RESPONSES = Counter("zhulong_feed_responses_total", "信息源响应数", ("source", "status"))
+FEED_ERRORS = Counter("zhulong_feed_errors_total", "信息源抓取失败数", ("source", "reason"))
+
+
+# === 启动 ===
+STARTUP_PHASE = Gauge("zhulong_startup_phase_seconds", "启动各阶段耗时", ("phase",))
+
+
+class StartupTimer:
+    """按阶段记录启动耗时，结果写入 STARTUP_PHASE 并可打印一行汇总"""
+
+    def __init__(self):
+        self.phases: list[tuple[str, float]] = []
+
+    def record(self, name: str, seconds: float) -> None:
+        self.phases.append((name, seconds))
+        STARTUP_PHASE.set((name,), seconds)
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def report(self) -> str:
+        total = sum(s for _, s in self.phases)
+        STARTUP_PHASE.set(("total",), total)
+        parts = " | ".join(f"{n} {s * 1000:.0f}ms" for n, s in self.phases)
+        return f"启动耗时 {total * 1000:.0f}ms: {parts}"
+
+
+# === 反馈学习 ===
+LEARN_FAILURES = Counter("zhulong_learn_failures_total", "反馈整合失败次数", ("mode",))
+LEARN_SKIPPED = Counter("zhulong_learn_skipped_total", "整合失败而跳过的反馈条数")
+
+
+# === 合并提交 ===
+WRITE_BATCH_ROWS = Histogram(
+    "zhulong_write_batch_rows", "合并提交每批行数",
+    ("table",), buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
@@ -0,0 +1,190 @@
+"""烛龙 - 数据库版本迁移
+
+create_all 只会创建缺失的表，不会修改已有表 (加索引、加列)。
+这里按版本号顺序执行迁移，已执行的版本记录在 schema_migrations 表中。
+迁移步骤需可重复执行：新库由 create_all 建好后再跑一遍不应出错。
+库已是最新版本时启动直接跳过 create_all 与迁移，因此任何表结构变化
+(包括新增表) 都必须新增一个迁移版本。
+"""
+from datetime import datetime
+from typing import Callable, Union
+from sqlalchemy import inspect, select, text
+from sqlalchemy.engine import Connection
+
+from database import (
+    DailyPoolORM, KeywordWeightORM, SchemaMigrationORM, SenderProfileORM, UnreadCounterORM,
+)
+from services.search import DOCUMENT_COLUMNS, FTS_TABLES, document, fts_ddl, index_body
+from services.unread import rebuild_counts
+
+Step = Union[str, Callable[[Connection], None]]
+
+
+def sqlite_only(*steps: Step) -> Callable[[Connection], None]:
+    """仅在 SQLite 上执行的步骤 (如 FTS5 虚拟表)"""
+    def step(conn: Connection) -> None:
+        if conn.dialect.name != "sqlite":
+            return
+        for s in steps:
+            if isinstance(s, str):
+                conn.execute(text(s))
+            else:
+                s(conn)
+    return step
+
+
+def _backfill_search_index(conn: Connection) -> None:
+    """为已有数据建立 (或按当前切分规则重建) 全文索引"""
+    for kind, (table, orm) in FTS_TABLES.items():
+        columns = [getattr(orm, c) for c in DOCUMENT_COLUMNS[kind]]
+        rows = conn.execute(select(orm.id, *columns)).all()
+        params = [
+            {"id": r.id, "body": index_body(document(kind, r))}
+            for r in rows
+        ]
+        if params:
+            conn.execute(
+                text(f"INSERT OR REPLACE INTO {table}(rowid, body) VALUES (:id, :body)"),
+                params,
+            )
+
+
+def add_column(table: str, column: str, ddl: str) -> Callable[[Connection], None]:
+    """列不存在时执行 ALTER TABLE ADD COLUMN"""
+    def step(conn: Connection) -> None:
+        cols = {c["name"] for c in inspect(conn).get_columns(table)}
+        if column not in cols:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+    return step
+
+
+def create_table(orm) -> Callable[[Connection], None]:
+    """表不存在时创建 (含索引)"""
+    def step(conn: Connection) -> None:
+        orm.__table__.create(conn, checkfirst=True)
+    return step
+
+
+def _user_keyword_weights(conn: Connection) -> None:
+    """keyword 唯一 -> (user_id, keyword) 唯一，已有权重归 default 用户"""
+    cols = {c["name"] for c in inspect(conn).get_columns("keyword_weights")}
+    if "user_id" in cols:
+        return
+    if conn.dialect.name == "postgresql":
+        conn.execute(text(
+            "ALTER TABLE keyword_weights ADD COLUMN user_id VARCHAR(50) NOT NULL DEFAULT 'default'"
+        ))
+        conn.execute(text("ALTER TABLE keyword_weights DROP CONSTRAINT IF EXISTS keyword_weights_keyword_key"))
+        conn.execute(text(
+            "ALTER TABLE keyword_weights ADD CONSTRAINT uq_keyword_weights_user_keyword "
+            "UNIQUE (user_id, keyword)"
+        ))
+        return
+    # SQLite 不能删除约束，重建表后迁入
+    conn.execute(text("ALTER TABLE keyword_weights RENAME TO keyword_weights_old"))
+    KeywordWeightORM.__table__.create(conn)
+    conn.execute(text(
+        "INSERT INTO keyword_weights (user_id, keyword, weight, updated_at) "
+        "SELECT 'default', keyword, weight, updated_at FROM keyword_weights_old"
+    ))
+    conn.execute(text("DROP TABLE keyword_weights_old"))
+
+
+def _user_unread_counters(conn: Connection) -> None:
+    """计数表主键加上 user_id：派生数据，直接重建后重新统计"""
+    cols = {c["name"] for c in inspect(conn).get_columns("unread_counters")}
+    if "user_id" not in cols:
+        UnreadCounterORM.__table__.drop(conn)
+        UnreadCounterORM.__table__.create(conn)
+    rebuild_counts(conn)
+
+
+# (版本号, 说明, 步骤)
+MIGRATIONS: list[tuple[int, str, list[Step]]] = [
+    (1, "热点查询索引", [
+        "CREATE INDEX IF NOT EXISTS ix_wechat_messages_received "
+        "ON wechat_messages (received_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_wechat_messages_priority_received "
+        "ON wechat_messages (priority, is_read, received_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_wechat_messages_unread_received "
+        "ON wechat_messages (is_read, received_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_memos_reminder "
+        "ON memos (is_completed, reminder_at)",
+        "CREATE INDEX IF NOT EXISTS ix_memos_open_created "
+        "ON memos (is_completed, created_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_memos_created "
+        "ON memos (created_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_feedbacks_content "
+        "ON feedbacks (content_id)",
+    ]),
+    # 旧反馈已在请求内同步学习过，默认标记为已学习
+    (2, "反馈异步学习标记", [
+        add_column("feedbacks", "learned", "BOOLEAN NOT NULL DEFAULT TRUE"),
+        "CREATE INDEX IF NOT EXISTS ix_feedbacks_learned ON feedbacks (learned, id)",
+    ]),
+    (3, "全文检索 (FTS5)", [
+        sqlite_only(*fts_ddl(), _backfill_search_index),
+    ]),
+    (4, "未读计数", []),  # 计数在 v7 按用户统计
+    (5, "归档扫描索引", [
+        "CREATE INDEX IF NOT EXISTS ix_contents_created ON contents (created_at)",
+        "CREATE INDEX IF NOT EXISTS ix_feedbacks_created ON feedbacks (created_at)",
+    ]),
+    (6, "发送者画像", [create_table(SenderProfileORM)]),
+    (7, "多用户", [
+        add_column("wechat_messages", "user_id", "VARCHAR(50) NOT NULL DEFAULT 'default'"),
+        add_column("memos", "user_id", "VARCHAR(50) NOT NULL DEFAULT 'default'"),
+        add_column("feedbacks", "user_id", "VARCHAR(50) NOT NULL DEFAULT 'default'"),
+        add_column("daily_batches", "scores", "TEXT DEFAULT ''"),
+        _user_keyword_weights,
+        _user_unread_counters,
+        "CREATE INDEX IF NOT EXISTS ix_wechat_messages_user_received "
+        "ON wechat_messages (user_id, received_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_wechat_messages_user_priority "
+        "ON wechat_messages (user_id, priority, is_read, received_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_wechat_messages_user_unread "
+        "ON wechat_messages (user_id, is_read, received_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_memos_user_open "
+        "ON memos (user_id, is_completed, created_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_memos_user_created ON memos (user_id, created_at, id)",
+        "DROP INDEX IF EXISTS ix_wechat_messages_priority_received",
+        "DROP INDEX IF EXISTS ix_wechat_messages_unread_received",
+        "DROP INDEX IF EXISTS ix_memos_open_created",
+        "DROP INDEX IF EXISTS ix_memos_created",
+    ]),
+    (8, "检索索引补充末字", [sqlite_only(_backfill_search_index)]),
+    (9, "当日候选池", [create_table(DailyPoolORM)]),
+]
+
+LATEST_VERSION = max(v for v, _, _ in MIGRATIONS)
+
+
+def current_version(conn: Connection) -> int:
+    """已执行的最高版本 (未建表时为 0)"""
+    if not inspect(conn).has_table(SchemaMigrationORM.__tablename__):
+        return 0
+    versions = conn.execute(select(SchemaMigrationORM.version)).scalars().all()
+    return max(versions, default=0)
+
+
+def schema_is_current(conn: Connection) -> bool:
+    return current_version(conn) >= LATEST_VERSION
+
+
+def run_migrations(conn: Connection) -> list[int]:
+    """执行所有未执行的迁移，返回本次执行的版本号"""
+    done = current_version(conn)
+    applied = []
+    for version, description, steps in MIGRATIONS:
+        if version <= done:
+            continue
+        for step in steps:
+            if isinstance(step, str):
+                conn.execute(text(step))
+            else:
+                step(conn)
+        conn.execute(SchemaMigrationORM.__table__.insert().values(
+            version=version, description=description, applied_at=datetime.utcnow(),
+        ))
+        applied.append(version)
+    return applied
@@ -62,6 +62,17 @@ class MemoItem(BaseModel):
     created_at: Optional[datetime] = None
 
 
+# === 全文检索 ===
+class SearchHit(BaseModel):
+    """检索结果"""
+    kind: str  # memo | message | content
+    id: int
+    title: str
+    snippet: str = ""
+    rank: float = 0.0  # bm25，越小越相关
+    timestamp: Optional[datetime] = None
+
+
 # === 用户输入 ===
 class UserInput(BaseModel):
     """用户输入 (语音转文字或直接文字)"""
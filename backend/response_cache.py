@@ -0,0 +1,98 @@
+"""烛龙 - GET 响应缓存
+
+读多写少的接口把序列化后的 JSON 字节连同 ETag 缓存在进程内，
+按标签 (memos / messages / contents) 由写接口失效；
+客户端带 If-None-Match 且未变化时直接返回 304。
+序列化用 orjson，pydantic 模型直接取字段，不再逐条 model_dump。
+生成响应期间若同标签被失效 (并发写已提交)，这次结果不写入缓存，避免缓存写之前的数据。
+produce() 返回的响应头带 Cache-Control: no-store 时 (临时结果) 同样不写入缓存。
+注意：缓存在进程内，多 worker 部署时各 worker 独立失效。
+"""
+import hashlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+import orjson
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+MAX_ENTRIES = 256
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    etag: str
+    headers: dict[str, str] = field(default_factory=dict)
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        return obj.__dict__
+    raise TypeError(f"无法序列化: {type(obj).__name__}")
+
+
+def dumps(data: Any) -> bytes:
+    """快速 JSON 序列化 (datetime / Enum / pydantic 模型)"""
+    return orjson.dumps(data, default=_default)
+
+
+def make_entry(data: Any, headers: dict[str, str] | None = None) -> CachedResponse:
+    body = dumps(data)
+    etag = '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+    return CachedResponse(body=body, etag=etag, headers=headers or {})
+
+
+def _not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = {t.strip().removeprefix("W/") for t in header.split(",")}
+    return etag in tags or "*" in tags
+
+
+def respond(request: Request, entry: CachedResponse, cache_control: str = "no-cache") -> Response:
+    """根据 If-None-Match 返回 304 或完整 JSON 响应"""
+    headers = {"ETag": entry.etag, "Cache-Control": cache_control, **entry.headers}
+    if _not_modified(request, entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(entry.body, media_type="application/json", headers=headers)
+
+
+# (标签, 键) -> 缓存响应，LRU
+_entries: "OrderedDict[tuple[str, str], CachedResponse]" = OrderedDict()
+# 标签 -> 失效次数 (代数)
+_generations: dict[str, int] = {}
+
+
+async def cached_response(
+    request: Request,
+    tag: str,
+    key: str,
+    produce: Callable[[], Awaitable[tuple[Any, dict[str, str]]]],
+    cache_control: str = "no-cache",
+) -> Response:
+    """
+    命中缓存直接返回；否则调用 produce() 得到 (数据, 额外响应头) 并缓存
+    """
+    entry = _entries.get((tag, key))
+    if entry is None:
+        generation = _generations.get(tag, 0)
+        data, headers = await produce()
+        entry = make_entry(data, headers)
+        if _generations.get(tag, 0) == generation and entry.headers.get("Cache-Control") != "no-store":
+            _entries[(tag, key)] = entry
+            while len(_entries) > MAX_ENTRIES:
+                _entries.popitem(last=False)
+    else:
+        _entries.move_to_end((tag, key))
+    return respond(request, entry, cache_control)
+
+
+def invalidate(*tags: str) -> None:
+    """写操作后失效对应标签下的全部缓存"""
+    for tag in tags:
+        _generations[tag] = _generations.get(tag, 0) + 1
+    for k in [k for k in _entries if k[0] in tags]:
+        del _entries[k]
@@ -1,4 +1,21 @@
 """烛龙 服务层"""
 from .info_refinement import refine_and_rank, record_feedback, fetch_feeds
-from .memo_service import create_memo, list_memos, get_pending_reminders, complete_memo, delete_memo
-from .wechat_filter import import_message, list_messages, classify_message, mark_read
+from .feed_crawler import close_crawler
+from .daily_push import get_daily_contents, is_saved, today_key
+from .learning import get_learner
+from .memo_service import (
+    create_memo, list_memos, get_pending_reminders,
+    complete_memo, complete_memos, delete_memo, delete_memos,
+)
+from .reminder_scheduler import get_reminder_scheduler
+from .wechat_filter import (
+    import_message, import_messages, list_messages, classify_message,
+    mark_read, mark_read_many, mark_all_read, set_priority, publish_imported, BULK_CHUNK_SIZE,
+)
+from .sender_profile import get_sender_profiles
+from .pubsub import get_hub, user_topic, MESSAGE_TOPICS
+from .unread import get_unread_counts, rebuild_unread_counts
+from .pagination import decode_cursor, next_cursor
+from .search import search
+from .write_buffer import start_write_buffers, stop_write_buffers
+from .archive import get_archiver, archive_old_rows, query_archive, list_partitions, ARCHIVE_TABLES
@@ -0,0 +1,221 @@
+"""烛龙 - 冷数据归档
+
+超过 archive_after_days 天的微信消息、推送内容和已学习的反馈，按天写入
+archive_dir/<类型>/<YYYY-MM-DD>.jsonl.gz，写盘成功后再从热表删除
+(同一事务内删除全文索引、扣减未读计数)，热表和 SQLite 文件保持小而快。
+
+- 每次归档以 gzip 成员追加到当天的分区文件，多次归档互不覆盖
+- 查询接口按日期范围只打开涉及的分区文件，只读
+- 写盘后、提交前进程退出时，下次会重复归档同一批行，读取时按 (id, 时间) 去重
+"""
+import asyncio
+import gzip
+import os
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Optional
+
+import orjson
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import get_settings, DEFAULT_USER
+from database import ContentORM, FeedbackORM, WeChatMessageORM
+from .search import unindex
+from .unread import adjust_unread
+
+# 类型 -> (ORM, 分区时间列)
+ARCHIVE_TABLES = {
+    "message": (WeChatMessageORM, "received_at"),
+    "content": (ContentORM, "created_at"),
+    "feedback": (FeedbackORM, "created_at"),
+}
+BATCH_SIZE = 2000
+
+
+def archive_root() -> Path:
+    return Path(get_settings().archive_dir)
+
+
+def _partition_path(kind: str, day: date) -> Path:
+    return archive_root() / kind / f"{day.isoformat()}.jsonl.gz"
+
+
+def _write_partitions(kind: str, rows: list[dict], ts_field: str) -> None:
+    """按天追加写入分区文件并落盘 (在线程中执行)"""
+    by_day: dict[date, list[bytes]] = {}
+    for row in rows:
+        by_day.setdefault(row[ts_field].date(), []).append(orjson.dumps(row) + b"\n")
+    for day, lines in by_day.items():
+        path = _partition_path(kind, day)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "ab") as f:
+            f.write(gzip.compress(b"".join(lines)))
+            f.flush()
+            os.fsync(f.fileno())
+
+
+async def _archive_batch(session: AsyncSession, kind: str, cutoff: datetime) -> int:
+    orm, ts_field = ARCHIVE_TABLES[kind]
+    ts = getattr(orm, ts_field)
+    criteria = [ts < cutoff]
+    if kind == "feedback":
+        criteria.append(orm.learned == True)  # 未学习的反馈留给后台学习任务
+    q = select(orm).where(*criteria).order_by(ts, orm.id).limit(BATCH_SIZE)
+    records = (await session.execute(q)).scalars().all()
+    if not records:
+        return 0
+    columns = [c.name for c in orm.__table__.columns]
+    rows = [{c: getattr(r, c) for c in columns} for r in records]
+    await asyncio.to_thread(_write_partitions, kind, rows, ts_field)
+
+    ids = [r["id"] for r in rows]
+    await session.execute(delete(orm).where(orm.id.in_(ids)))
+    if kind == "message":
+        await unindex(session, "message", ids)
+        await adjust_unread(
+            session, [(r["user_id"], r["priority"]) for r in rows if not r["is_read"]], sign=-1,
+        )
+    elif kind == "content":
+        await unindex(session, "content", ids)
+    await session.commit()
+    return len(rows)
+
+
+async def archive_old_rows(
+    session: AsyncSession,
+    older_than_days: Optional[int] = None,
+    kinds: Optional[list[str]] = None,
+) -> dict[str, int]:
+    """把超过期限的行移入归档文件，返回各类型归档行数"""
+    days = older_than_days if older_than_days is not None else get_settings().archive_after_days
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    counts = {}
+    for kind in kinds or list(ARCHIVE_TABLES):
+        total = 0
+        while n := await _archive_batch(session, kind, cutoff):
+            total += n
+            if n < BATCH_SIZE:
+                break
+        counts[kind] = total
+    return counts
+
+
+def list_partitions(kind: str) -> list[date]:
+    """已有的分区日期 (升序)"""
+    root = archive_root() / kind
+    if not root.is_dir():
+        return []
+    days = []
+    for p in root.glob("*.jsonl.gz"):
+        try:
+            days.append(date.fromisoformat(p.name[:10]))
+        except ValueError:
+            continue
+    return sorted(days)
+
+
+def _matches(row: dict, q: Optional[str], filters: dict) -> bool:
+    for k, v in filters.items():
+        if v is not None and row.get(k) != v:
+            return False
+    if q:
+        text = " ".join(str(row.get(f) or "") for f in ("title", "summary", "sender", "content", "comment"))
+        return q.lower() in text.lower()
+    return True
+
+
+def _scan(kind: str, start: date, end: date, q: Optional[str], filters: dict, limit: int) -> list[dict]:
+    """从新到旧扫描 [start, end] 内的分区 (在线程中执行)"""
+    orm, ts_field = ARCHIVE_TABLES[kind]
+    owned = hasattr(orm, "user_id")
+    results: list[dict] = []
+    seen: set[tuple] = set()
+    for day in reversed(list_partitions(kind)):
+        if day > end:
+            continue
+        if day < start or len(results) >= limit:
+            break
+        with gzip.open(_partition_path(kind, day), "rb") as f:
+            rows = [orjson.loads(line) for line in f]
+        if owned:
+            for row in rows:
+                row.setdefault("user_id", DEFAULT_USER)  # 多用户之前归档的行
+        rows.sort(key=lambda r: (r[ts_field], r["id"]), reverse=True)
+        for row in rows:
+            key = (row["id"], row[ts_field])
+            if key in seen or not _matches(row, q, filters):
+                continue
+            seen.add(key)
+            results.append(row)
+            if len(results) >= limit:
+                break
+    return results
+
+
+async def query_archive(
+    kind: str,
+    start: date,
+    end: date,
+    q: Optional[str] = None,
+    limit: int = 100,
+    **filters,
+) -> list[dict]:
+    """
+    只读查询归档 (按时间倒序)；只打开 start..end 之间的分区文件
+    filters: 字段精确匹配，如 priority="urgent"、sender="张三"
+    """
+    if kind not in ARCHIVE_TABLES:
+        raise ValueError(f"未知归档类型: {kind}")
+    return await asyncio.to_thread(_scan, kind, start, end, q, filters, limit)
+
+
+class Archiver:
+    """后台定时归档 (archive_after_days 为 0 时不启动)"""
+
+    def __init__(self, interval_hours: float = 24.0):
+        self.interval_hours = interval_hours
+        self._session_factory = None
+        self._on_archived = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, session_factory, on_archived=None) -> None:
+        """on_archived(counts)：每轮归档后回调 (如失效响应缓存)"""
+        self._session_factory = session_factory
+        self._on_archived = on_archived
+        if self._task is None and get_settings().archive_after_days > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def run_once(self) -> dict[str, int]:
+        async with self._session_factory() as session:
+            counts = await archive_old_rows(session)
+        if self._on_archived is not None and any(counts.values()):
+            self._on_archived(counts)
+        return counts
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                pass  # 未提交的批次仍在热表中，下一轮重试
+            await asyncio.sleep(self.interval_hours * 3600)
+
+
+_archiver: Optional[Archiver] = None
+
+
+def get_archiver() -> Archiver:
+    global _archiver
+    if _archiver is None:
+        _archiver = Archiver(get_settings().archive_interval_hours)
+    return _archiver
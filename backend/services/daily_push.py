@@ -0,0 +1,141 @@
+"""烛龙 - 每日推送批次
+
+每天每个用户只生成一次推送：首次请求在锁内抓取一轮候选 (所有用户共享，见
+info_refinement.CandidatePool)，再为所有当天还没有批次的用户并行打分，
+结果写入 daily_batches 表并缓存在内存，之后的请求直接返回。
+当天候选池存入 daily_pools 表，重启后新增用户也只需在池上打一次分，无需重新抓取。
+抓取为空，或有源失败且推送条数不足时，结果只返回不保存 (不写批次、不存池、不缓存)，
+下次请求重新抓取。
+每个用户只排除自己往日推送过的内容 (精确或近似重复)，推送给别人的不受影响。
+显式刷新时重新抓取，并只为发起刷新的用户重新排序 (当天已推送的条目仍参与排序；
+结果比原批次少时保留原批次)。
+"""
+import asyncio
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import ContentORM, DailyBatchORM
+from models import ContentItem
+from config import get_settings, DEFAULT_USER
+from .info_refinement import (
+    CandidatePool, build_pool, content_from_orm, load_pool, pushed_content_ids,
+    rank_pool, save_pool, store_selected,
+)
+
+# (batch_date, user_id) -> 当日推送
+_cache: dict[tuple[str, str], list[ContentItem]] = {}
+# batch_date -> 当日生成锁 / 共享候选池
+_locks: dict[str, asyncio.Lock] = {}
+_pools: dict[str, CandidatePool] = {}
+
+
+def today_key() -> str:
+    """当前推送日期 (YYYY-MM-DD)"""
+    offset = get_settings().daily_push_utc_offset
+    return (datetime.utcnow() + timedelta(hours=offset)).strftime("%Y-%m-%d")
+
+
+def _remember(key: tuple[str, str], items: list[ContentItem]) -> None:
+    """写入内存缓存，并清理非当天的旧批次与候选池"""
+    for k in [k for k in _cache if k[0] != key[0]]:
+        _cache.pop(k, None)
+    for day in [d for d in _pools if d != key[0]]:
+        _pools.pop(day, None)
+        _locks.pop(day, None)
+    _cache[key] = items
+
+
+def is_saved(user_id: str = DEFAULT_USER) -> bool:
+    """当天该用户的推送是否已保存 (抓取失败时返回的临时结果不算)"""
+    return (today_key(), user_id) in _cache
+
+
+async def _load_batches(session: AsyncSession, batch_date: str) -> dict[str, DailyBatchORM]:
+    """当天已有的批次 (user_id -> 批次)"""
+    result = await session.execute(
+        select(DailyBatchORM).where(DailyBatchORM.batch_date == batch_date)
+    )
+    return {b.user_id: b for b in result.scalars().all()}
+
+
+async def _load_contents(session: AsyncSession, batch: DailyBatchORM) -> list[ContentItem]:
+    ids = [int(i) for i in (batch.content_ids or "").split(",") if i]
+    if not ids:
+        return []
+    scores = [float(s) for s in (batch.scores or "").split(",") if s]
+    if len(scores) != len(ids):
+        scores = [None] * len(ids)  # 旧批次未保存分数，用内容表中的分数
+    result = await session.execute(select(ContentORM).where(ContentORM.id.in_(ids)))
+    rows = {r.id: r for r in result.scalars().all()}
+    return [content_from_orm(rows[i], s) for i, s in zip(ids, scores) if i in rows]
+
+
+async def get_daily_contents(
+    session: AsyncSession,
+    user_id: str = DEFAULT_USER,
+    refresh: bool = False,
+) -> list[ContentItem]:
+    """获取当日推送；当天尚未生成 (或 refresh=True) 时生成并保存"""
+    batch_date = today_key()
+    key = (batch_date, user_id)
+    if not refresh and key in _cache:
+        return _cache[key]
+
+    lock = _locks.setdefault(batch_date, asyncio.Lock())
+    async with lock:
+        if not refresh and key in _cache:
+            return _cache[key]
+
+        batches = await _load_batches(session, batch_date)
+        # 空批次 (旧版本在抓取失败时写入) 视同未生成
+        done = {u for u, b in batches.items() if b.content_ids}
+        if user_id in done and not refresh:
+            items = await _load_contents(session, batches[user_id])
+            _remember(key, items)
+            return items
+
+        pool = None if refresh else _pools.get(batch_date) or await load_pool(session, batch_date)
+        crawled = pool is None or not pool.items
+        if crawled:
+            pool = await build_pool(session)
+        if refresh:
+            users = [user_id]
+        else:
+            # 顺带为其他当天还没有批次的用户生成，共用这一轮抓取
+            users = [user_id] + [
+                u for u in get_settings().user_ids()
+                if u != user_id and u not in done and (batch_date, u) not in _cache
+            ]
+        pushed = await pushed_content_ids(session, users, batch_date)
+        limit = get_settings().daily_push_count
+        ranked = await rank_pool(session, pool, users, limit, pushed)
+        if refresh and user_id in batches:
+            current = await _load_contents(session, batches[user_id])
+            if len(ranked[user_id]) < len(current):
+                _remember(key, current)  # 候选不足 (如信息源暂时不可用)，保留原批次
+                return current
+        selected = await store_selected(session, pool, ranked)
+        if not pool.items or (pool.failed and any(len(r) < limit for r in ranked.values())):
+            await session.commit()  # 只提交已入库的内容，批次留待下次请求重新生成
+            return selected[user_id]
+        if crawled:
+            await save_pool(session, batch_date, pool)
+        _pools[batch_date] = pool
+
+        for u, items in selected.items():
+            content_ids = ",".join(str(i.id) for i in items)
+            scores = ",".join(f"{i.relevance_score:.4f}" for i in items)
+            batch = batches.get(u)
+            if batch:
+                batch.content_ids = content_ids
+                batch.scores = scores
+                batch.created_at = datetime.utcnow()
+            else:
+                session.add(DailyBatchORM(
+                    batch_date=batch_date, user_id=u, content_ids=content_ids, scores=scores,
+                ))
+        await session.commit()
+        for u, items in selected.items():
+            _remember((batch_date, u), items)
+        return selected[user_id]
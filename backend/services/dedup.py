@@ -0,0 +1,163 @@
+"""烛龙 - 内容去重
+
+打分前过滤重复内容：
+1. URL 规范化 (去掉 utm_* 等跟踪参数、fragment、www. 前缀等) 后按哈希精确去重；
+   规范化结果只用作去重键，入库与展示仍用原链接
+2. 标题+摘要计算 64 位 SimHash，汉明距离 <= SIMHASH_DISTANCE 视为近似重复
+   (转载、换标题党等)；指纹按 4 段 16 位分别建索引，候选查询走索引
+
+指纹写入 content_fingerprints 表，跨天生效。批内重复直接去掉 (unique_items)；
+与历史内容的重复只给出命中的内容 id (history_matches)，由调用方按各用户的推送记录排除。
+"""
+import hashlib
+import re
+from typing import Iterable
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from sqlalchemy import select, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import ContentFingerprintORM
+from .text_tokens import bigram_tokens
+
+SIMHASH_BITS = 64
+SIMHASH_DISTANCE = 3
+# 少于该数量的特征不做近似去重 (短文本 SimHash 不可靠)
+SIMHASH_MIN_FEATURES = 6
+
+TRACKING_PARAMS = {
+    "spm", "from", "ref", "source", "share", "share_source", "share_medium",
+    "fbclid", "gclid", "yclid", "mc_cid", "mc_eid", "timestamp", "isappinstalled",
+}
+
+
+
+def canonicalize_url(url: str) -> str:
+    """规范化 URL，使同一文章的不同链接形式得到相同结果"""
+    parts = urlsplit(url.strip())
+    scheme = "https" if parts.scheme in ("http", "https") else parts.scheme
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+    path = re.sub(r"/{2,}", "/", parts.path).rstrip("/") or "/"
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS
+    )
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+def url_hash(canonical_url: str) -> str:
+    return hashlib.sha1(canonical_url.encode()).hexdigest()
+
+
+def simhash(text: str) -> int | None:
+    """64 位 SimHash (有符号，便于存入 BIGINT)；特征过少时返回 None"""
+    feats = bigram_tokens(text)
+    if len(feats) < SIMHASH_MIN_FEATURES:
+        return None
+    vec = [0] * SIMHASH_BITS
+    for f in feats:
+        h = int.from_bytes(hashlib.blake2b(f.encode(), digest_size=8).digest(), "big")
+        for i in range(SIMHASH_BITS):
+            vec[i] += 1 if (h >> i) & 1 else -1
+    value = sum(1 << i for i, v in enumerate(vec) if v > 0)
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def hamming(a: int, b: int) -> int:
+    return ((a ^ b) & 0xFFFFFFFFFFFFFFFF).bit_count()
+
+
+def bands(value: int) -> tuple[int, int, int, int]:
+    """SimHash 拆成 4 段 16 位，任意两指纹距离 <= 3 时至少有一段相同"""
+    v = value & 0xFFFFFFFFFFFFFFFF
+    return tuple((v >> (16 * i)) & 0xFFFF for i in range(4))
+
+
+def fingerprint(item: dict) -> dict:
+    """为抓取条目补充 canonical_url / url_hash / simhash"""
+    canonical = canonicalize_url(item["url"])
+    item["canonical_url"] = canonical
+    item["url_hash"] = url_hash(canonical)
+    item["simhash"] = simhash(item["title"] + " " + item.get("summary", ""))
+    return item
+
+
+def unique_items(items: Iterable[dict]) -> list[dict]:
+    """去掉批内重复 (精确或近似)，保持原顺序 (items 需先经过 fingerprint)"""
+    unique: list[dict] = []
+    seen_urls: set[str] = set()
+    kept_hashes: list[int] = []
+    for item in items:
+        if not item["url"] or item["url_hash"] in seen_urls:
+            continue
+        sh = item["simhash"]
+        if sh is not None and any(hamming(sh, k) <= SIMHASH_DISTANCE for k in kept_hashes):
+            continue
+        seen_urls.add(item["url_hash"])
+        if sh is not None:
+            kept_hashes.append(sh)
+        unique.append(item)
+    return unique
+
+
+async def history_matches(session: AsyncSession, items: list[dict]) -> list[set[int]]:
+    """
+    每个条目命中的已入库内容 id (URL 哈希相同或 SimHash 近似)；
+    是否算作"已推送"由调用方按用户的推送记录判断
+    """
+    if not items:
+        return []
+    band_values: list[set[int]] = [set(), set(), set(), set()]
+    for item in items:
+        if item["simhash"] is not None:
+            for i, b in enumerate(bands(item["simhash"])):
+                band_values[i].add(b)
+    F = ContentFingerprintORM
+    conds = [F.url_hash.in_([i["url_hash"] for i in items])]
+    conds += [
+        col.in_(vals)
+        for col, vals in zip((F.band0, F.band1, F.band2, F.band3), band_values)
+        if vals
+    ]
+    result = await session.execute(
+        select(F.content_id, F.url_hash, F.simhash).where(or_(*conds))
+    )
+    by_url: dict[str, int] = {}
+    by_hash: list[tuple[int, int]] = []
+    for row in result:
+        by_url[row.url_hash] = row.content_id
+        if row.simhash is not None:
+            by_hash.append((row.simhash, row.content_id))
+
+    matches = []
+    for item in items:
+        ids = {by_url[item["url_hash"]]} if item["url_hash"] in by_url else set()
+        if item["simhash"] is not None:
+            ids.update(cid for sh, cid in by_hash if hamming(item["simhash"], sh) <= SIMHASH_DISTANCE)
+        matches.append(ids)
+    return matches
+
+
+async def stored_content_ids(session: AsyncSession, url_hashes: Iterable[str]) -> dict[str, int]:
+    """已入库条目：url_hash -> content_id"""
+    hashes = list(set(url_hashes))
+    if not hashes:
+        return {}
+    F = ContentFingerprintORM
+    result = await session.execute(select(F.url_hash, F.content_id).where(F.url_hash.in_(hashes)))
+    return {r.url_hash: r.content_id for r in result}
+
+
+def fingerprint_row(content_id: int, item: dict) -> ContentFingerprintORM:
+    """已入库内容的指纹记录 (item 需先经过 fingerprint)"""
+    sh = item["simhash"]
+    b = bands(sh) if sh is not None else (None, None, None, None)
+    return ContentFingerprintORM(
+        content_id=content_id,
+        url_hash=item["url_hash"],
+        simhash=sh,
+        band0=b[0], band1=b[1], band2=b[2], band3=b[3],
+    )
@@ -0,0 +1,280 @@
+"""烛龙 - RSS 并发抓取器
+
+- 长生命周期 httpx.AsyncClient，复用连接池
+- 所有信息源并发抓取，按域名限制并发数
+- 记录每个源的 ETag / Last-Modified，未变化的源以 304 返回并复用上次结果
+- feedparser 解析与摘要 HTML 清洗放到进程池 (或线程池) 执行，不阻塞事件循环
+- 流式模式下边下载边增量解析，够条数即停止下载，且单个源有字节上限；
+  增量解析器有状态，逐块送到专用线程池解析 (XML 解析与摘要清洗同样不在事件循环上)
+- httpx / feedparser 首次抓取时才导入，不拖慢应用冷启动
+"""
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, AsyncIterator, Optional
+from urllib.parse import urlsplit
+
+import metrics
+from config import get_settings
+from .feed_stream import IncrementalFeedParser, ParseError, clean_summary
+
+if TYPE_CHECKING:
+    import httpx
+
+
+@dataclass
+class FeedCacheEntry:
+    """单个信息源的条件请求缓存"""
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    items: list[dict] = field(default_factory=list)
+
+
+def parse_feed(text: str | bytes, limit: int = 5) -> list[dict]:
+    """解析 RSS 文本，取前 limit 条 (在工作进程/线程中执行)"""
+    import feedparser
+
+    feed = feedparser.parse(text)
+    source = feed.feed.get("title", "未知")
+    items = []
+    for entry in feed.entries[:limit]:
+        items.append({
+            "title": entry.get("title", ""),
+            "url": entry.get("link", ""),
+            "source": source,
+            "summary": clean_summary(entry.get("summary", entry.get("description", ""))),
+            "published": entry.get("published_parsed"),
+        })
+    return items
+
+
+class FeedCrawler:
+    """并发 RSS 抓取器"""
+
+    def __init__(
+        self,
+        timeout: float = 15.0,
+        max_connections: int = 20,
+        max_per_host: int = 2,
+        entries_per_feed: int = 5,
+        parse_mode: str = "process",
+        parse_workers: int = 2,
+        streaming: bool = True,
+        max_bytes: int = 2_000_000,
+    ):
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_per_host = max_per_host
+        self.entries_per_feed = entries_per_feed
+        self.parse_mode = parse_mode
+        self.parse_workers = parse_workers
+        self.streaming = streaming
+        self.max_bytes = max_bytes
+        self._executor: Optional[Executor] = None
+        self._stream_executor: Optional[ThreadPoolExecutor] = None
+        self._client: Optional["httpx.AsyncClient"] = None
+        self._host_limits: dict[str, asyncio.Semaphore] = {}
+        self._cache: dict[str, FeedCacheEntry] = {}
+
+    @property
+    def client(self) -> "httpx.AsyncClient":
+        if self._client is None or self._client.is_closed:
+            import httpx
+
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+        return self._client
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.parse_mode == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.parse_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.parse_workers, thread_name_prefix="feed-parse",
+                )
+        return self._executor
+
+    @property
+    def stream_executor(self) -> ThreadPoolExecutor:
+        if self._stream_executor is None:
+            self._stream_executor = ThreadPoolExecutor(
+                max_workers=self.parse_workers, thread_name_prefix="feed-stream",
+            )
+        return self._stream_executor
+
+    async def _feed(self, parser: IncrementalFeedParser, chunk: Optional[bytes]) -> bool:
+        """增量解析一块 (chunk 为 None 时结束解析)，在线程中执行"""
+        loop = asyncio.get_running_loop()
+        if chunk is None:
+            await loop.run_in_executor(self.stream_executor, parser.close)
+            return parser.done
+        return await loop.run_in_executor(self.stream_executor, parser.feed, chunk)
+
+    async def _parse(self, text: str | bytes) -> list[dict]:
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(
+                self.executor, parse_feed, text, self.entries_per_feed,
+            )
+        except BrokenProcessPool:
+            # 工作进程异常退出，下次重建进程池
+            self._executor = None
+            raise
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        sem = self._host_limits.get(host)
+        if sem is None:
+            sem = asyncio.Semaphore(self.max_per_host)
+            self._host_limits[host] = sem
+        return sem
+
+    async def fetch_one(self, url: str) -> Optional[list[dict]]:
+        """抓取单个源；304 时返回缓存结果，失败 (异常或非 200 响应) 时返回 None"""
+        parts = urlsplit(url)
+        source = parts.netloc + parts.path
+        start = time.perf_counter()
+        try:
+            return await self._fetch(url, source)
+        except Exception as e:
+            metrics.FEED_ERRORS.inc((source, type(e).__name__))
+            return None
+        finally:
+            metrics.FEED_FETCH.observe((source,), time.perf_counter() - start)
+
+    async def _fetch(self, url: str, source: str) -> Optional[list[dict]]:
+        cached = self._cache.get(url)
+        headers = {}
+        if cached:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+        async with self._host_limit(url):
+            if self.streaming:
+                async with self.client.stream("GET", url, headers=headers) as resp:
+                    metrics.FEED_RESPONSES.inc((source, str(resp.status_code)))
+                    if resp.status_code == 304 and cached:
+                        return list(cached.items)
+                    if resp.status_code != 200:
+                        return None
+                    items = await self._read_stream(resp, source)
+            else:
+                resp = await self.client.get(url, headers=headers)
+                metrics.FEED_RESPONSES.inc((source, str(resp.status_code)))
+                if resp.status_code == 304 and cached:
+                    return list(cached.items)
+                if resp.status_code != 200:
+                    return None
+                metrics.FEED_BYTES.inc((source,), len(resp.content))
+                start = time.perf_counter()
+                items = await self._parse(resp.text)
+                metrics.FEED_PARSE.observe((source,), time.perf_counter() - start)
+        self._cache[url] = FeedCacheEntry(
+            etag=resp.headers.get("etag"),
+            last_modified=resp.headers.get("last-modified"),
+            items=items,
+        )
+        return list(items)
+
+    async def _read_stream(self, resp: "httpx.Response", source: str) -> list[dict]:
+        """
+        边下载边增量解析，够条数立即停止；超过 max_bytes 的部分不再下载。
+        增量解析失败时用已下载的内容回退到 feedparser。
+        """
+        parser: Optional[IncrementalFeedParser] = IncrementalFeedParser(self.entries_per_feed)
+        raw = bytearray()
+        parse_time = 0.0
+        try:
+            async for chunk in resp.aiter_bytes():
+                chunk = chunk[:self.max_bytes - len(raw)]
+                raw += chunk
+                if parser is not None:
+                    t = time.perf_counter()
+                    try:
+                        if await self._feed(parser, chunk):
+                            return parser.items
+                    except ParseError:
+                        parser = None
+                    finally:
+                        parse_time += time.perf_counter() - t
+                if len(raw) >= self.max_bytes:
+                    break
+            t = time.perf_counter()
+            try:
+                if parser is not None:
+                    try:
+                        await self._feed(parser, None)
+                    except ParseError:
+                        pass  # 截断或结尾残缺，已解析出的条目仍可用
+                    if parser.items:
+                        return parser.items
+                return await self._parse(bytes(raw))
+            finally:
+                parse_time += time.perf_counter() - t
+        finally:
+            metrics.FEED_BYTES.inc((source,), len(raw))
+            metrics.FEED_PARSE.observe((source,), parse_time)
+
+    async def iter_crawl(self, urls: list[str]) -> AsyncIterator[tuple[str, Optional[list[dict]]]]:
+        """并发抓取所有源，按完成先后逐个产出 (url, 条目)；抓取失败的源条目为 None"""
+        async def one(url: str) -> tuple[str, Optional[list[dict]]]:
+            return url, await self.fetch_one(url)
+
+        for fut in asyncio.as_completed([one(u) for u in urls]):
+            yield await fut
+
+    async def crawl(self, urls: list[str]) -> list[dict]:
+        """并发抓取所有源，结果按源顺序拼接"""
+        results = {url: items async for url, items in self.iter_crawl(urls)}
+        return [item for url in urls for item in results.get(url) or []]
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._stream_executor is not None:
+            self._stream_executor.shutdown(wait=False, cancel_futures=True)
+            self._stream_executor = None
+
+
+_crawler: Optional[FeedCrawler] = None
+
+
+def get_crawler() -> FeedCrawler:
+    """全局抓取器 (进程内共享连接池与条件请求缓存)"""
+    global _crawler
+    if _crawler is None:
+        s = get_settings()
+        _crawler = FeedCrawler(
+            timeout=s.feed_timeout,
+            max_connections=s.feed_max_connections,
+            max_per_host=s.feed_max_per_host,
+            entries_per_feed=s.feed_entries_per_feed,
+            parse_mode=s.feed_parse_mode,
+            parse_workers=s.feed_parse_workers,
+            streaming=s.feed_streaming,
+            max_bytes=s.feed_max_bytes,
+        )
+    return _crawler
+
+
+async def close_crawler() -> None:
+    """关闭抓取器连接池 (应用退出时调用)"""
+    global _crawler
+    if _crawler is not None:
+        await _crawler.aclose()
+        _crawler = None
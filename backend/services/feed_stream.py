@@ -0,0 +1,117 @@
+"""烛龙 - RSS/Atom 增量解析
+
+下载过程中逐块喂给 XMLPullParser，每解析完一个 item/entry 立即提取并释放，
+收集够所需条数即可停止下载。遇到 expat 无法处理的源 (非 UTF-8 编码、
+HTML 实体等) 时统一抛出 ParseError，由调用方回退到 feedparser。
+"""
+import html
+import re
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+from xml.etree.ElementTree import Element, ParseError, XMLPullParser
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_SPACE_RE = re.compile(r"\s+")
+
+ITEM_TAGS = {"item", "entry"}
+SUMMARY_TAGS = ("description", "summary", "encoded", "content")
+DATE_TAGS = ("pubDate", "published", "updated", "date", "issued")
+
+__all__ = ["IncrementalFeedParser", "ParseError", "clean_summary"]
+
+
+def clean_summary(raw: str, max_len: int = 300) -> str:
+    """去掉摘要中的 HTML 标签与实体，压缩空白后截断"""
+    text = html.unescape(_TAG_RE.sub(" ", raw or ""))
+    return _SPACE_RE.sub(" ", text).strip()[:max_len]
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _text(elem: Element) -> str:
+    return "".join(elem.itertext()).strip()
+
+
+def _parse_date(text: str) -> Optional[time.struct_time]:
+    """RFC 822 或 ISO 8601 时间 -> UTC struct_time (与 feedparser 一致)"""
+    if not text:
+        return None
+    try:
+        dt = parsedate_to_datetime(text)
+    except (TypeError, ValueError):
+        try:
+            dt = datetime.fromisoformat(text.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc)
+    return dt.utctimetuple()
+
+
+class IncrementalFeedParser:
+    """增量解析器：feed() 返回 True 表示已收集到 limit 条"""
+
+    def __init__(self, limit: int = 5):
+        self.limit = limit
+        self.source: Optional[str] = None
+        self.items: list[dict] = []
+        self._parser = XMLPullParser(events=("start", "end"))
+        self._depth_in_item = 0
+
+    @property
+    def done(self) -> bool:
+        return len(self.items) >= self.limit
+
+    def feed(self, chunk: bytes) -> bool:
+        try:
+            self._parser.feed(chunk)
+        except ValueError as e:  # expat 不支持 GBK 等多字节编码
+            raise ParseError(str(e)) from e
+        self._drain()
+        return self.done
+
+    def close(self) -> None:
+        self._parser.close()
+        self._drain()
+
+    def _drain(self) -> None:
+        for event, elem in self._parser.read_events():
+            tag = _local(elem.tag)
+            if event == "start":
+                if tag in ITEM_TAGS:
+                    self._depth_in_item += 1
+                continue
+            if tag in ITEM_TAGS:
+                self._depth_in_item -= 1
+                if not self.done:
+                    self.items.append(self._extract(elem))
+                elem.clear()
+            elif tag == "title" and not self._depth_in_item and self.source is None:
+                self.source = _text(elem)
+
+    def _extract(self, elem: Element) -> dict:
+        fields: dict[str, str] = {}
+        link = ""
+        for child in elem:
+            tag = _local(child.tag)
+            if tag == "link":
+                href = child.get("href")
+                if href and child.get("rel", "alternate") == "alternate":
+                    link = link or href
+                elif not href:
+                    link = link or _text(child)
+            elif tag not in fields:
+                fields[tag] = _text(child)
+        summary = next((fields[t] for t in SUMMARY_TAGS if fields.get(t)), "")
+        published = next((fields[t] for t in DATE_TAGS if fields.get(t)), "")
+        return {
+            "title": clean_summary(fields.get("title", ""), 500),
+            "url": link,
+            "source": self.source or "未知",
+            "summary": clean_summary(summary),
+            "published": _parse_date(published),
+        }
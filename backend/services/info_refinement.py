@@ -1,14 +1,21 @@
 """烛龙 - 信息提炼服务"""
+import asyncio
+from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Optional
-import httpx
-import feedparser
-from sqlalchemy import select
+import orjson
+from sqlalchemy import delete, insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from database import ContentORM, FeedbackORM, KeywordWeightORM
+from database import ContentFingerprintORM, ContentORM, DailyBatchORM, DailyPoolORM, FeedbackORM
 from models import ContentItem, ContentType
-from config import get_settings
+from config import get_settings, DEFAULT_USER
+from .feed_crawler import get_crawler
+from .keyword_matcher import KeywordMatcher, weighted_matcher
+from .dedup import fingerprint, fingerprint_row, history_matches, stored_content_ids, unique_items
+from .learning import get_keyword_weights, get_learner
+from .search import document, index_rows
+from .write_buffer import get_write_buffer
 
 
 # 默认信息源 RSS (科技、商业、创业相关)
@@ -21,71 +28,179 @@ DEFAULT_FEEDS = [
 
 
 async def fetch_feeds() -> list[dict]:
-    """从RSS源抓取内容"""
-    items = []
-    async with httpx.AsyncClient(timeout=15.0) as client:
-        for feed_url in DEFAULT_FEEDS:
-            try:
-                resp = await client.get(feed_url)
-                if resp.status_code == 200:
-                    feed = feedparser.parse(resp.text)
-                    for entry in feed.entries[:5]:
-                        items.append({
-                            "title": entry.get("title", ""),
-                            "url": entry.get("link", ""),
-                            "source": feed.feed.get("title", "未知"),
-                            "summary": entry.get("summary", entry.get("description", ""))[:300],
-                            "published": entry.get("published_parsed"),
-                        })
-            except Exception:
-                continue
-    return items
-
-
-def calc_relevance(title: str, summary: str, keywords: list[str], weights: dict) -> float:
-    """计算内容与用户兴趣的相关性分数"""
-    text = (title + " " + summary).lower()
-    score = 0.0
-    for kw in keywords:
-        weight = weights.get(kw.lower(), 1.0)
-        if kw.lower() in text:
-            score += weight
+    """从RSS源并发抓取内容"""
+    return await get_crawler().crawl(get_settings().feed_urls or DEFAULT_FEEDS)
+
+
+def calc_relevance(
+    title: str,
+    summary: str,
+    keywords: list[str],
+    weights: dict,
+    matcher: Optional[KeywordMatcher] = None,
+) -> float:
+    """计算内容与用户兴趣的相关性分数 (matcher 可预先编译后复用)"""
+    if matcher is None:
+        matcher = weighted_matcher(keywords, weights)
+    score = sum(matcher.match(title + " " + summary).values())
     return min(score, 10.0)
 
 
-async def get_keyword_weights(session: AsyncSession) -> dict[str, float]:
-    """获取关键词权重"""
-    result = await session.execute(select(KeywordWeightORM))
-    rows = result.scalars().all()
-    return {r.keyword: r.weight for r in rows}
+def content_from_orm(r: ContentORM, score: Optional[float] = None) -> ContentItem:
+    return ContentItem(
+        id=r.id,
+        title=r.title,
+        url=r.url,
+        source=r.source or "",
+        summary=r.summary or "",
+        content_type=ContentType(r.content_type or "news"),
+        published_at=r.published_at,
+        created_at=r.created_at,
+        relevance_score=score if score is not None else r.relevance_score or 0.0,
+    )
 
 
-async def refine_and_rank(
+@dataclass
+class CandidatePool:
+    """
+    一轮抓取去重后的候选，所有用户共享：
+    各用户只在池上各打一次分，选中的条目只入库一次 (stored 记录已入库的 canonical_url)；
+    failed 为本轮抓取失败的源数 (从 daily_pools 读回的池为 0)
+    """
+    items: list[dict]
+    stored: dict[str, ContentItem] = field(default_factory=dict)
+    failed: int = 0
+
+
+# 候选池持久化的字段 (published 为 struct_time，存为列表)
+POOL_FIELDS = ("title", "url", "source", "summary", "published", "canonical_url", "url_hash", "simhash")
+
+
+async def build_pool(session: AsyncSession) -> CandidatePool:
+    """
+    抓取 + 批内去重 (每轮只做一次)：各源抓完即计算指纹，不等最慢的源；
+    去重按源顺序进行，结果与完成先后无关。与历史内容的重复在 rank_pool 中按用户排除
+    """
+    urls = get_settings().feed_urls or DEFAULT_FEEDS
+    crawled: dict[str, list[dict]] = {}
+    failed = 0
+    async for url, items in get_crawler().iter_crawl(urls):
+        if items is None:
+            failed += 1
+            continue
+        crawled[url] = [fingerprint(i) for i in items]
+    items = unique_items(item for url in urls for item in crawled.get(url, []))
+    return CandidatePool(items, failed=failed)
+
+
+async def save_pool(session: AsyncSession, batch_date: str, pool: CandidatePool) -> None:
+    """保存当日候选池，并删除往日的 (不提交)"""
+    items = [
+        {**{k: item.get(k) for k in POOL_FIELDS},
+         "published": list(item["published"][:6]) if item.get("published") else None}
+        for item in pool.items
+    ]
+    await session.execute(delete(DailyPoolORM).where(DailyPoolORM.batch_date != batch_date))
+    await session.merge(DailyPoolORM(batch_date=batch_date, items=orjson.dumps(items).decode()))
+
+
+async def load_pool(session: AsyncSession, batch_date: str) -> Optional[CandidatePool]:
+    row = await session.get(DailyPoolORM, batch_date)
+    return CandidatePool(orjson.loads(row.items)) if row is not None else None
+
+
+async def pushed_content_ids(
+    session: AsyncSession, user_ids: list[str], before_date: Optional[str] = None
+) -> dict[str, set[int]]:
+    """各用户已推送过的内容 id (before_date 给出时只算该日期之前的批次)"""
+    q = select(DailyBatchORM.user_id, DailyBatchORM.content_ids).where(
+        DailyBatchORM.user_id.in_(user_ids)
+    )
+    if before_date is not None:
+        q = q.where(DailyBatchORM.batch_date < before_date)
+    pushed: dict[str, set[int]] = {u: set() for u in user_ids}
+    for user_id, content_ids in await session.execute(q):
+        pushed[user_id].update(int(i) for i in (content_ids or "").split(",") if i)
+    return pushed
+
+
+def _select(scores: list[float], allowed: list[bool], limit: int) -> list[tuple[float, int]]:
+    """取 TopN：(分数, 候选下标)，分数为 0 的候选最多保留 limit * 2 个参与排序"""
+    kept = []
+    for i, score in enumerate(scores):
+        if not allowed[i]:
+            continue
+        if score > 0 or len(kept) < limit * 2:  # 至少保留一些
+            kept.append((score, i))
+    kept.sort(key=lambda x: x[0], reverse=True)
+    return kept[:limit]
+
+
+async def rank_pool(
     session: AsyncSession,
-    limit: int = 10
-) -> list[ContentItem]:
+    pool: CandidatePool,
+    user_ids: list[str],
+    limit: int = 10,
+    pushed: Optional[dict[str, set[int]]] = None,
+) -> dict[str, list[tuple[float, int]]]:
     """
-    信息提炼：抓取、打分、排序、取TopN
+    各用户按自己的关键词与权重在共享候选池上打分 (线程中并行)，返回各自的 TopN；
+    pushed 为各用户往日已推送的内容 id，与其重复 (精确或近似) 的候选对该用户排除
     """
+    from .scoring import score_candidates  # numpy 较重，首次排序时才导入
+
     settings = get_settings()
-    keywords = settings.interest_keywords
-    weights = await get_keyword_weights(session)
-    
-    raw_items = await fetch_feeds()
-    scored = []
-    for item in raw_items:
-        score = calc_relevance(
-            item["title"], item["summary"],
-            keywords, weights
+    matches = await history_matches(session, pool.items)
+    jobs = []
+    for user_id in user_ids:
+        user = settings.get_user(user_id)
+        weights = dict(await get_keyword_weights(session, user_id))
+        jobs.append(asyncio.to_thread(
+            score_candidates, pool.items, user.interest_keywords, weights,
+            tfidf=settings.scoring_tfidf,
+            half_life_hours=settings.scoring_half_life_hours,
+        ))
+    scores = await asyncio.gather(*jobs)
+    ranked = {}
+    for user_id, s in zip(user_ids, scores):
+        seen = (pushed or {}).get(user_id, set())
+        allowed = [not (m & seen) for m in matches]
+        ranked[user_id] = _select(s.tolist(), allowed, limit)
+    return ranked
+
+
+async def store_selected(
+    session: AsyncSession,
+    pool: CandidatePool,
+    ranked: dict[str, list[tuple[float, int]]],
+) -> dict[str, list[ContentItem]]:
+    """
+    选中条目的并集写入 contents (已入库的直接复用，不提交)，
+    返回各用户的推送列表 (relevance_score 为该用户的分数)
+    """
+    best: dict[int, float] = {}
+    for picks in ranked.values():
+        for score, i in picks:
+            best[i] = max(score, best.get(i, score))
+
+    # 已入库的条目 (当天刷新前的批次、往日推送给其他用户的) 复用原内容
+    pending = [i for i in best if pool.items[i]["canonical_url"] not in pool.stored]
+    existing = await stored_content_ids(session, (pool.items[i]["url_hash"] for i in pending))
+    if existing:
+        result = await session.execute(
+            select(ContentORM).where(ContentORM.id.in_(set(existing.values())))
         )
-        if score > 0 or len(scored) < limit * 2:  # 至少保留一些
-            scored.append((score, item))
-    
-    # 按分数排序
-    scored.sort(key=lambda x: x[0], reverse=True)
-    
-    results = []
-    for score, item in scored[:limit]:
+        rows = {r.id: r for r in result.scalars().all()}
+        for i in pending:
+            row = rows.get(existing.get(pool.items[i]["url_hash"]))
+            if row is not None:
+                pool.stored[pool.items[i]["canonical_url"]] = content_from_orm(row)
+
+    added = []
+    for i, score in best.items():
+        item = pool.items[i]
+        if item["canonical_url"] in pool.stored:
+            continue
         published = None
         if item.get("published"):
             try:
@@ -95,7 +210,7 @@ async def refine_and_rank(
         
         content = ContentORM(
             title=item["title"],
-            url=item["url"],
+            url=item["url"],  # 不用 canonical_url：仅 http 的站点、参数有意义的地址规范化后可能打不开
             source=item.get("source", ""),
             summary=item.get("summary", ""),
             content_type="news",
@@ -104,7 +219,15 @@ async def refine_and_rank(
         )
         session.add(content)
         await session.flush()
-        results.append(ContentItem(
+        if item["url_hash"] in existing:  # 原内容已归档：指纹改指向新入库的内容
+            await session.execute(
+                update(ContentFingerprintORM)
+                .where(ContentFingerprintORM.url_hash == item["url_hash"])
+                .values(content_id=content.id)
+            )
+        else:
+            session.add(fingerprint_row(content.id, item))
+        stored = ContentItem(
             id=content.id,
             title=content.title,
             url=content.url,
@@ -112,9 +235,34 @@ async def refine_and_rank(
             summary=content.summary,
             content_type=ContentType.NEWS,
             published_at=published,
+            created_at=content.created_at,
             relevance_score=score,
-        ))
+        )
+        pool.stored[item["canonical_url"]] = stored
+        added.append(stored)
     
+    await index_rows(session, "content", [(i.id, document("content", i)) for i in added])
+    return {
+        user_id: [
+            pool.stored[pool.items[i]["canonical_url"]].model_copy(update={"relevance_score": score})
+            for score, i in picks
+        ]
+        for user_id, picks in ranked.items()
+    }
+
+
+async def refine_and_rank(
+    session: AsyncSession,
+    limit: int = 10,
+    user_id: str = DEFAULT_USER,
+) -> list[ContentItem]:
+    """
+    信息提炼：抓取、去重、打分、排序、取TopN (单个用户；多用户共享抓取见 daily_push)
+    """
+    pool = await build_pool(session)
+    pushed = await pushed_content_ids(session, [user_id])
+    ranked = await rank_pool(session, pool, [user_id], limit, pushed)
+    results = (await store_selected(session, pool, ranked))[user_id]
     await session.commit()
     return results
 
@@ -123,32 +271,20 @@ async def record_feedback(
     session: AsyncSession,
     content_id: int,
     score: int,
-    comment: Optional[str] = None
+    comment: Optional[str] = None,
+    user_id: str = DEFAULT_USER,
 ) -> None:
-    """记录反馈，用于学习优化"""
-    fb = FeedbackORM(content_id=content_id, score=score, comment=comment)
-    session.add(fb)
-    await session.commit()
-    
-    # 简单学习：根据高分反馈提取关键词并增加权重
-    if score >= 4:
-        result = await session.execute(
-            select(ContentORM).where(ContentORM.id == content_id)
-        )
-        content = result.scalar_one_or_none()
-        if content:
-            settings = get_settings()
-            for kw in settings.interest_keywords:
-                if kw.lower() in (content.title + content.summary).lower():
-                    # 更新或插入权重
-                    r = await session.execute(
-                        select(KeywordWeightORM).where(
-                            KeywordWeightORM.keyword == kw.lower()
-                        )
-                    )
-                    row = r.scalar_one_or_none()
-                    if row:
-                        row.weight = min(row.weight + 0.1, 3.0)
-                    else:
-                        session.add(KeywordWeightORM(keyword=kw.lower(), weight=1.2))
-            await session.commit()
+    """记录反馈 (只追加一条记录，关键词权重由后台批量学习)"""
+    row = {"user_id": user_id, "content_id": content_id, "score": score, "comment": comment}
+    buffer = get_write_buffer("feedbacks", _write_feedbacks)
+    if buffer is not None:
+        await buffer.submit(row)
+    else:
+        session.add(FeedbackORM(**row))
+        await session.commit()
+    get_learner().notify()
+
+
+async def _write_feedbacks(session: AsyncSession, rows: list[dict]) -> list[int]:
+    stmt = insert(FeedbackORM).returning(FeedbackORM.id, sort_by_parameter_order=True)
+    return list((await session.execute(stmt, rows)).scalars())
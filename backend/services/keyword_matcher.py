@@ -0,0 +1,101 @@
+"""烛龙 - 多关键词匹配 (Aho-Corasick)
+
+关键词预编译为自动机，每段文本只扫描一遍即可得到全部命中关键词，
+耗时与关键词数量无关。消息分类与内容相关性打分共用。
+"""
+from collections import deque
+from functools import lru_cache
+from typing import Any, Iterable
+
+
+class KeywordMatcher:
+    """预编译的多模式匹配器 (忽略大小写)
+
+    patterns: 关键词 -> 值 (权重、优先级等)，match 时原样返回
+    """
+
+    __slots__ = ("values", "_goto", "_fail", "_out")
+
+    def __init__(self, patterns: dict[str, Any]):
+        self.values: dict[str, Any] = {}
+        for kw, value in patterns.items():
+            kw = kw.lower()
+            if kw:
+                self.values[kw] = value
+
+        goto: list[dict[str, int]] = [{}]
+        out: list[tuple[str, ...]] = [()]
+        for kw in self.values:
+            node = 0
+            for ch in kw:
+                nxt = goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[node][ch] = nxt
+                    goto.append({})
+                    out.append(())
+                node = nxt
+            out[node] += (kw,)
+
+        # BFS 构建失配指针，并把后缀节点的输出合并进来
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in goto[node].items():
+                queue.append(nxt)
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                out[nxt] += out[fail[nxt]]
+
+        self._goto = goto
+        self._fail = fail
+        self._out = out
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def match(self, text: str) -> dict[str, Any]:
+        """扫描文本，返回 {命中关键词: 值}"""
+        goto, fail, out = self._goto, self._fail, self._out
+        found: dict[str, Any] = {}
+        node = 0
+        for ch in text.lower():
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                for kw in out[node]:
+                    found[kw] = self.values[kw]
+        return found
+
+    def counts(self, text: str) -> dict[str, int]:
+        """扫描文本，返回 {命中关键词: 出现次数}"""
+        goto, fail, out = self._goto, self._fail, self._out
+        found: dict[str, int] = {}
+        node = 0
+        for ch in text.lower():
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                for kw in out[node]:
+                    found[kw] = found.get(kw, 0) + 1
+        return found
+
+
+@lru_cache(maxsize=16)
+def _build(items: tuple[tuple[str, Any], ...]) -> KeywordMatcher:
+    return KeywordMatcher(dict(items))
+
+
+def get_matcher(patterns: dict[str, Any]) -> KeywordMatcher:
+    """按内容缓存匹配器：关键词或值不变时复用已编译的自动机"""
+    return _build(tuple(sorted(patterns.items())))
+
+
+def weighted_matcher(keywords: Iterable[str], weights: dict[str, float]) -> KeywordMatcher:
+    """兴趣关键词匹配器，值为 KeywordWeightORM 中的学习权重 (默认 1.0)"""
+    return get_matcher({kw.lower(): weights.get(kw.lower(), 1.0) for kw in keywords})
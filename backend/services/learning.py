@@ -0,0 +1,201 @@
+"""烛龙 - 反馈学习
+
+record_feedback 只追加一条 feedbacks 记录 (learned = False)。后台整合任务
+批量取出未学习的反馈，一次查询相关内容，统计命中的兴趣关键词，
+再以一条批量 upsert 写回 keyword_weights，并同步内存中的权重缓存。
+整批失败时逐条重试，仍失败的反馈在本进程内跳过 (计入 zhulong_learn_skipped_total)，
+不会卡住后面的反馈。
+打分直接读取该缓存，无需每次查库。多用户时反馈、权重和兴趣关键词均按用户区分。
+"""
+import asyncio
+from collections import Counter
+from datetime import datetime
+from typing import Collection, Optional
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import ContentORM, FeedbackORM, KeywordWeightORM
+import metrics
+from config import get_settings, DEFAULT_USER
+from .keyword_matcher import weighted_matcher
+
+# 高分反馈阈值及权重调整规则
+LEARN_MIN_SCORE = 4
+WEIGHT_FIRST = 1.2
+WEIGHT_STEP = 0.1
+WEIGHT_MAX = 3.0
+
+# user_id -> (关键词 -> 权重)；不在其中表示该用户尚未从库中载入
+_weights: dict[str, dict[str, float]] = {}
+
+
+async def get_keyword_weights(
+    session: AsyncSession, user_id: str = DEFAULT_USER
+) -> dict[str, float]:
+    """获取用户的关键词权重 (首次从库中载入，之后读内存缓存)"""
+    if user_id not in _weights:
+        result = await session.execute(
+            select(KeywordWeightORM).where(KeywordWeightORM.user_id == user_id)
+        )
+        _weights[user_id] = {r.keyword: r.weight for r in result.scalars().all()}
+    return _weights[user_id]
+
+
+def _upsert(session: AsyncSession, rows: list[dict]):
+    """按方言生成 keyword_weights 批量 upsert 语句"""
+    dialect = session.bind.dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(KeywordWeightORM).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[KeywordWeightORM.user_id, KeywordWeightORM.keyword],
+        set_={"weight": stmt.excluded.weight, "updated_at": stmt.excluded.updated_at},
+    )
+
+
+def _unlearned(*columns, skip: Collection[int] = ()):
+    q = select(*columns).where(FeedbackORM.learned == False)
+    if skip:
+        q = q.where(FeedbackORM.id.notin_(skip))
+    return q.order_by(FeedbackORM.id)
+
+
+async def consolidate(
+    session: AsyncSession, batch_size: int = 1000, skip: Collection[int] = ()
+) -> int:
+    """整合一批未学习的反馈 (跳过 skip 中的 id)，返回处理条数"""
+    result = await session.execute(
+        _unlearned(
+            FeedbackORM.id, FeedbackORM.user_id, FeedbackORM.content_id, FeedbackORM.score,
+            skip=skip,
+        ).limit(batch_size)
+    )
+    feedbacks = result.all()
+    if not feedbacks:
+        return 0
+
+    # 每条高分反馈对应内容中命中的 (该用户的) 关键词各 +1 次
+    liked: dict[str, list[int]] = {}
+    for fb in feedbacks:
+        if fb.score >= LEARN_MIN_SCORE:
+            liked.setdefault(fb.user_id, []).append(fb.content_id)
+    hits: dict[str, Counter] = {}
+    if liked:
+        result = await session.execute(
+            select(ContentORM.id, ContentORM.title, ContentORM.summary)
+            .where(ContentORM.id.in_({i for ids in liked.values() for i in ids}))
+        )
+        texts = {r.id: r.title + " " + (r.summary or "") for r in result}
+        settings = get_settings()
+        for user_id, content_ids in liked.items():
+            user = settings.get_user(user_id)
+            if user is None:
+                continue  # 用户已从配置中移除
+            matcher = weighted_matcher(user.interest_keywords, {})
+            counter = hits.setdefault(user_id, Counter())
+            for content_id in content_ids:
+                if content_id in texts:
+                    counter.update(matcher.match(texts[content_id]).keys())
+
+    new_weights: dict[str, dict[str, float]] = {}
+    rows = []
+    now = datetime.utcnow()
+    for user_id, counter in hits.items():
+        weights = await get_keyword_weights(session, user_id)
+        for kw, n in counter.items():
+            if kw in weights:
+                w = weights[kw] + WEIGHT_STEP * n
+            else:
+                w = WEIGHT_FIRST + WEIGHT_STEP * (n - 1)
+            w = round(min(w, WEIGHT_MAX), 4)
+            new_weights.setdefault(user_id, {})[kw] = w
+            rows.append({"user_id": user_id, "keyword": kw, "weight": w, "updated_at": now})
+    if rows:
+        await session.execute(_upsert(session, rows))
+
+    await session.execute(
+        update(FeedbackORM)
+        .where(FeedbackORM.id.in_([fb.id for fb in feedbacks]))
+        .values(learned=True)
+    )
+    await session.commit()
+    for user_id, weights in new_weights.items():
+        _weights[user_id].update(weights)
+    return len(feedbacks)
+
+
+class FeedbackLearner:
+    """后台反馈整合任务：有新反馈时唤醒，稍等片刻攒批后整合"""
+
+    def __init__(self, batch_window: float = 1.0, batch_size: int = 1000):
+        self.batch_window = batch_window
+        self.batch_size = batch_size
+        self._skipped: set[int] = set()  # 逐条重试仍失败的反馈 (重启后再试)
+        self._session_factory = None
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, session_factory) -> None:
+        self._session_factory = session_factory
+        if self._task is None:
+            self._wakeup.set()  # 启动时先处理积压
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def notify(self) -> None:
+        self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            await asyncio.sleep(self.batch_window)
+            self._wakeup.clear()
+            try:
+                async with self._session_factory() as session:
+                    while await consolidate(session, self.batch_size, self._skipped):
+                        pass
+            except Exception:
+                metrics.LEARN_FAILURES.inc(("batch",))
+                try:
+                    await self._isolate()
+                except Exception:
+                    metrics.LEARN_FAILURES.inc(("isolate",))  # 如数据库不可用，下次唤醒时重试
+                    continue
+
+    async def _isolate(self) -> None:
+        """整批失败后逐条整合 (最多一批)，跳过失败的反馈，之后恢复批量整合"""
+        for _ in range(self.batch_size):
+            async with self._session_factory() as session:
+                result = await session.execute(
+                    _unlearned(FeedbackORM.id, skip=self._skipped).limit(1)
+                )
+                fb_id = result.scalar_one_or_none()
+                if fb_id is None:
+                    return
+                try:
+                    await consolidate(session, 1, self._skipped)
+                except Exception:
+                    self._skipped.add(fb_id)
+                    metrics.LEARN_FAILURES.inc(("single",))
+                    metrics.LEARN_SKIPPED.inc()
+        self.notify()
+
+
+_learner: Optional[FeedbackLearner] = None
+
+
+def get_learner() -> FeedbackLearner:
+    global _learner
+    if _learner is None:
+        _learner = FeedbackLearner()
+    return _learner
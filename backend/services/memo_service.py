@@ -1,69 +1,102 @@
 """烛龙 - 备忘录服务"""
 from datetime import datetime
-from typing import Optional
-from sqlalchemy import select, and_
+from typing import Iterable, Optional
+from sqlalchemy import select, insert, update, delete, and_, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from config import DEFAULT_USER
 from database import MemoORM
 from models import MemoItem
+from .pagination import Cursor
+from .search import document, index_rows, unindex
+from .write_buffer import get_write_buffer
+
+
+def memo_from_orm(r: MemoORM) -> MemoItem:
+    return MemoItem(
+        id=r.id,
+        title=r.title,
+        content=r.content or "",
+        reminder_at=r.reminder_at,
+        is_completed=r.is_completed,
+        created_at=r.created_at,
+    )
 
 
 async def create_memo(
     session: AsyncSession,
     title: str,
     content: str = "",
-    reminder_at: Optional[datetime] = None
+    reminder_at: Optional[datetime] = None,
+    user_id: str = DEFAULT_USER,
 ) -> MemoItem:
     """创建备忘录"""
+    buffer = get_write_buffer("memos", _write_memos)
+    if buffer is not None:
+        memo_id, created_at = await buffer.submit({
+            "user_id": user_id, "title": title, "content": content, "reminder_at": reminder_at,
+        })
+        return MemoItem(
+            id=memo_id, title=title, content=content or "",
+            reminder_at=reminder_at, created_at=created_at,
+        )
     memo = MemoORM(
+        user_id=user_id,
         title=title,
         content=content,
         reminder_at=reminder_at,
     )
     session.add(memo)
+    await session.flush()
+    await index_rows(session, "memo", [(memo.id, document("memo", memo))])
     await session.commit()
     await session.refresh(memo)
-    return MemoItem(
-        id=memo.id,
-        title=memo.title,
-        content=memo.content or "",
-        reminder_at=memo.reminder_at,
-        is_completed=memo.is_completed,
-        created_at=memo.created_at,
+    return memo_from_orm(memo)
+
+
+async def _write_memos(session: AsyncSession, rows: list[dict]) -> list[tuple]:
+    """合并提交：一条 INSERT ... RETURNING 写入整批备忘录"""
+    stmt = insert(MemoORM).returning(
+        MemoORM.id, MemoORM.created_at, sort_by_parameter_order=True,
     )
+    result = [tuple(r) for r in await session.execute(stmt, rows)]
+    await index_rows(session, "memo", [
+        (memo_id, f"{row['title']} {row['content'] or ''}")
+        for (memo_id, _), row in zip(result, rows)
+    ])
+    return result
 
 
 async def list_memos(
     session: AsyncSession,
     include_completed: bool = False,
-    limit: int = 50
+    limit: int = 50,
+    cursor: Optional[Cursor] = None,
+    user_id: str = DEFAULT_USER,
 ) -> list[MemoItem]:
-    """获取备忘录列表"""
-    q = select(MemoORM).order_by(MemoORM.created_at.desc())
+    """获取备忘录列表 (按 created_at, id 倒序；cursor 为上一页最后一条)"""
+    q = select(MemoORM).where(MemoORM.user_id == user_id).order_by(
+        MemoORM.created_at.desc(), MemoORM.id.desc()
+    )
     if not include_completed:
         q = q.where(MemoORM.is_completed == False)
+    if cursor:
+        q = q.where(tuple_(MemoORM.created_at, MemoORM.id) < cursor)
     q = q.limit(limit)
     result = await session.execute(q)
     rows = result.scalars().all()
-    return [
-        MemoItem(
-            id=r.id,
-            title=r.title,
-            content=r.content or "",
-            reminder_at=r.reminder_at,
-            is_completed=r.is_completed,
-            created_at=r.created_at,
-        )
-        for r in rows
-    ]
+    return [memo_from_orm(r) for r in rows]
 
 
-async def get_pending_reminders(session: AsyncSession) -> list[MemoItem]:
+async def get_pending_reminders(
+    session: AsyncSession, user_id: str = DEFAULT_USER
+) -> list[MemoItem]:
     """获取待提醒的备忘录 (reminder_at <= now)"""
     now = datetime.utcnow()
     result = await session.execute(
         select(MemoORM).where(
             and_(
+                MemoORM.user_id == user_id,
                 MemoORM.reminder_at != None,
                 MemoORM.reminder_at <= now,
                 MemoORM.is_completed == False,
@@ -71,36 +104,52 @@ async def get_pending_reminders(session: AsyncSession) -> list[MemoItem]:
         ).order_by(MemoORM.reminder_at)
     )
     rows = result.scalars().all()
-    return [
-        MemoItem(
-            id=r.id,
-            title=r.title,
-            content=r.content or "",
-            reminder_at=r.reminder_at,
-            is_completed=r.is_completed,
-            created_at=r.created_at,
-        )
-        for r in rows
-    ]
+    return [memo_from_orm(r) for r in rows]
+
+
+async def complete_memos(
+    session: AsyncSession, memo_ids: Iterable[int], user_id: str = DEFAULT_USER
+) -> list[int]:
+    """批量标记完成 (单条 UPDATE ... RETURNING)，返回实际存在的 id"""
+    ids = list(memo_ids)
+    if not ids:
+        return []
+    result = await session.execute(
+        update(MemoORM)
+        .where(MemoORM.id.in_(ids), MemoORM.user_id == user_id)
+        .values(is_completed=True)
+        .returning(MemoORM.id)
+        .execution_options(synchronize_session=False)
+    )
+    done = list(result.scalars())
+    await session.commit()
+    return done
 
 
-async def complete_memo(session: AsyncSession, memo_id: int) -> bool:
+async def complete_memo(session: AsyncSession, memo_id: int, user_id: str = DEFAULT_USER) -> bool:
     """标记完成"""
-    result = await session.execute(select(MemoORM).where(MemoORM.id == memo_id))
-    memo = result.scalar_one_or_none()
-    if not memo:
-        return False
-    memo.is_completed = True
+    return bool(await complete_memos(session, [memo_id], user_id))
+
+
+async def delete_memos(
+    session: AsyncSession, memo_ids: Iterable[int], user_id: str = DEFAULT_USER
+) -> list[int]:
+    """批量删除 (单条 DELETE ... RETURNING，同一事务内删除索引)，返回实际删除的 id"""
+    ids = list(memo_ids)
+    if not ids:
+        return []
+    result = await session.execute(
+        delete(MemoORM)
+        .where(MemoORM.id.in_(ids), MemoORM.user_id == user_id)
+        .returning(MemoORM.id)
+        .execution_options(synchronize_session=False)
+    )
+    deleted = list(result.scalars())
+    await unindex(session, "memo", deleted)
     await session.commit()
-    return True
+    return deleted
 
 
-async def delete_memo(session: AsyncSession, memo_id: int) -> bool:
+async def delete_memo(session: AsyncSession, memo_id: int, user_id: str = DEFAULT_USER) -> bool:
     """删除备忘录"""
-    result = await session.execute(select(MemoORM).where(MemoORM.id == memo_id))
-    memo = result.scalar_one_or_none()
-    if not memo:
-        return False
-    await session.delete(memo)
-    await session.commit()
-    return True
+    return bool(await delete_memos(session, [memo_id], user_id))
@@ -0,0 +1,33 @@
+"""烛龙 - 游标分页
+
+列表按 (时间, id) 倒序，游标为上一页最后一条的 (时间, id)，下一页只需
+在索引上做一次范围扫描，与翻到第几页无关，也不受新插入数据影响。
+"""
+import base64
+from datetime import datetime
+from typing import Optional
+
+Cursor = tuple[datetime, int]
+
+
+def encode_cursor(ts: datetime, row_id: int) -> str:
+    raw = f"{ts.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Cursor:
+    """解析游标，格式错误时抛出 ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        ts, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(ts), int(row_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"无效的游标: {token}") from e
+
+
+def next_cursor(items: list, limit: int, field: str) -> Optional[str]:
+    """本页已满时返回下一页游标 (items 为带 id 与时间字段的模型)"""
+    if len(items) < limit or not items:
+        return None
+    last = items[-1]
+    return encode_cursor(getattr(last, field), last.id)
@@ -0,0 +1,107 @@
+"""烛龙 - 进程内发布/订阅
+
+按主题 (message.urgent / message.normal / message.routine / reminder，
+多用户时以 "<user_id>/" 为前缀，见 user_topic) 分发事件，
+客户端经 SSE 或 WebSocket 订阅，新消息与提醒实时推送，不必轮询列表接口。
+
+- 发布不阻塞：每个订阅者一个有界队列，publish 只做入队
+- 相同 key 的未送达事件合并为最新一条 (如批量导入的计数通知)
+- 慢客户端队列满时丢弃最旧的事件，并在下一次取事件时先收到 overflow 通知，
+  告知各主题丢了多少条，客户端据此重新拉取列表
+"""
+import asyncio
+import itertools
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Iterable, Optional
+
+MESSAGE_TOPICS = ("message.urgent", "message.normal", "message.routine")
+
+
+def user_topic(user_id: str, topic: str) -> str:
+    """用户私有主题"""
+    return f"{user_id}/{topic}"
+
+
+@dataclass
+class Event:
+    topic: str
+    kind: str
+    data: Any
+    key: Optional[str] = None  # 相同 key 的未送达事件只保留最新一条
+
+
+class Subscription:
+    """单个订阅者的有界事件队列"""
+
+    def __init__(self, topics: Iterable[str], maxsize: int = 100):
+        self.topics = frozenset(topics)
+        self.maxsize = maxsize
+        self._events: OrderedDict[Any, Event] = OrderedDict()
+        self._seq = itertools.count()
+        self._dropped: dict[str, int] = {}
+        self._ready = asyncio.Event()
+
+    def put(self, event: Event) -> None:
+        key = (event.topic, event.key) if event.key else next(self._seq)
+        if key in self._events:
+            del self._events[key]  # 合并：旧的同 key 事件作废
+        elif len(self._events) >= self.maxsize:
+            _, old = self._events.popitem(last=False)
+            self._dropped[old.topic] = self._dropped.get(old.topic, 0) + 1
+        self._events[key] = event
+        self._ready.set()
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Event]:
+        """取下一条事件；超时返回 None"""
+        if not self._events and not self._dropped:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        if self._dropped:
+            dropped, self._dropped = self._dropped, {}
+            return Event("*", "overflow", {"dropped": dropped})
+        _, event = self._events.popitem(last=False)
+        return event
+
+
+class PubSubHub:
+    """主题 -> 订阅者集合"""
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._topics: dict[str, set[Subscription]] = {}
+
+    def subscribe(self, topics: Iterable[str], maxsize: Optional[int] = None) -> Subscription:
+        sub = Subscription(topics, maxsize or self.queue_size)
+        for topic in sub.topics:
+            self._topics.setdefault(topic, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        for topic in sub.topics:
+            subs = self._topics.get(topic)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._topics[topic]
+
+    def publish(self, topic: str, kind: str, data: Any, key: Optional[str] = None) -> int:
+        """发布事件，返回收到的订阅者数"""
+        subs = self._topics.get(topic, ())
+        event = Event(topic, kind, data, key)
+        for sub in subs:
+            sub.put(event)
+        return len(subs)
+
+
+_hub: Optional[PubSubHub] = None
+
+
+def get_hub() -> PubSubHub:
+    global _hub
+    if _hub is None:
+        _hub = PubSubHub()
+    return _hub
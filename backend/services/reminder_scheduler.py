@@ -0,0 +1,113 @@
+"""烛龙 - 备忘录提醒调度器
+
+启动时把未来的 reminder_at 载入最小堆，由单个后台任务睡眠到最近的提醒时刻，
+到点后发布到所属用户的 reminder 主题 (见 pubsub.user_topic)，由 SSE 推送给已连接的客户端。备忘录的创建/完成/删除同步更新堆，
+客户端无需轮询 /api/memos/reminders。
+"""
+import asyncio
+import heapq
+from datetime import datetime, timezone
+from typing import Optional
+from sqlalchemy import select, and_
+
+from config import DEFAULT_USER
+from database import MemoORM
+from models import MemoItem
+from .memo_service import memo_from_orm
+from .pubsub import get_hub, user_topic
+
+
+def _as_utc(dt: datetime) -> datetime:
+    """统一为 UTC naive 时间 (与库中存储一致)"""
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+class ReminderScheduler:
+    """进程内提醒调度 (最小堆 + 惰性删除)"""
+
+    def __init__(self):
+        self._heap: list[tuple[datetime, int]] = []
+        self._pending: dict[int, tuple[MemoItem, str]] = {}  # memo_id -> (备忘录, user_id)
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, session_factory) -> None:
+        """载入未来的提醒并启动调度任务"""
+        now = datetime.utcnow()
+        async with session_factory() as session:
+            result = await session.execute(
+                select(MemoORM).where(
+                    and_(
+                        MemoORM.reminder_at != None,
+                        MemoORM.reminder_at > now,
+                        MemoORM.is_completed == False,
+                    )
+                )
+            )
+            for r in result.scalars().all():
+                self.schedule(memo_from_orm(r), r.user_id)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def schedule(self, memo: MemoItem, user_id: str = DEFAULT_USER) -> None:
+        """加入/更新提醒；无提醒时间或已完成则取消"""
+        if memo.id is None:
+            return
+        if memo.reminder_at is None or memo.is_completed:
+            self.cancel(memo.id)
+            return
+        at = _as_utc(memo.reminder_at)
+        self._pending[memo.id] = (memo, user_id)
+        heapq.heappush(self._heap, (at, memo.id))
+        self._wakeup.set()
+
+    def cancel(self, memo_id: int) -> None:
+        """取消提醒 (堆中旧条目在出堆时丢弃)"""
+        self._pending.pop(memo_id, None)
+
+    def _publish(self, memo: MemoItem, user_id: str) -> None:
+        get_hub().publish(user_topic(user_id, "reminder"), "reminder", memo, key=f"memo:{memo.id}")
+
+    def _pop_due(self, now: datetime) -> list[tuple[MemoItem, str]]:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            at, memo_id = heapq.heappop(self._heap)
+            entry = self._pending.get(memo_id)
+            if entry is not None and _as_utc(entry[0].reminder_at) == at:
+                del self._pending[memo_id]
+                due.append(entry)
+        return due
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            for memo, user_id in self._pop_due(datetime.utcnow()):
+                self._publish(memo, user_id)
+            timeout = None
+            if self._heap:
+                timeout = max((self._heap[0][0] - datetime.utcnow()).total_seconds(), 0)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+
+_scheduler: Optional[ReminderScheduler] = None
+
+
+def get_reminder_scheduler() -> ReminderScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = ReminderScheduler()
+    return _scheduler
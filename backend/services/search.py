@@ -0,0 +1,184 @@
+"""烛龙 - 全文检索 (SQLite FTS5)
+
+备忘录、微信消息、推送内容各有一张 FTS5 表，rowid 即原表 id。
+中文先在服务层按二元切分 (text_tokens.bigram_tokens) 再写入，
+另在末尾追加每段汉字的末字，使单字前缀查询也能命中末字 (不影响二元组短语的相邻关系)；
+查询词同样切分后组成短语查询，按 bm25 排序。索引由各写入路径在同一事务内维护。
+备忘录和消息按用户隔离 (联结原表过滤 user_id)，推送内容所有用户共享。
+非 SQLite 数据库不建索引，检索退化为 LIKE 查询。
+"""
+import html
+import re
+from typing import Iterable, Optional
+from sqlalchemy import select, or_, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import DEFAULT_USER
+from database import ContentORM, MemoORM, WeChatMessageORM
+from models import SearchHit
+from .text_tokens import bigram_tokens, is_cjk, trailing_chars
+
+# kind -> (FTS 表, 原表 ORM)
+FTS_TABLES = {
+    "memo": ("memos_fts", MemoORM),
+    "message": ("wechat_messages_fts", WeChatMessageORM),
+    "content": ("contents_fts", ContentORM),
+}
+
+# kind -> 参与索引的列 (迁移回填时只查这些列，不依赖后续版本加的列)
+DOCUMENT_COLUMNS = {
+    "memo": ("title", "content"),
+    "message": ("sender", "content"),
+    "content": ("title", "summary"),
+}
+
+SNIPPET_RADIUS = 40
+
+
+def fts_ddl() -> list[str]:
+    """建表语句 (迁移中执行)"""
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5(body, tokenize='unicode61')"
+        for table, _ in FTS_TABLES.values()
+    ]
+
+
+def document(kind: str, row) -> str:
+    """参与索引的文本"""
+    if kind == "memo":
+        return f"{row.title} {row.content or ''}"
+    if kind == "message":
+        return f"{row.sender} {row.content}"
+    return f"{row.title} {row.summary or ''}"
+
+
+def index_body(text: str) -> str:
+    """写入 FTS 的文本：二元切分 + 各段末字"""
+    return " ".join(bigram_tokens(text) + trailing_chars(text))
+
+
+def _enabled(session: AsyncSession) -> bool:
+    return session.bind.dialect.name == "sqlite"
+
+
+async def index_rows(session: AsyncSession, kind: str, rows: Iterable[tuple[int, str]]) -> None:
+    """写入/覆盖索引 (不提交，随调用方事务一起提交)"""
+    if not _enabled(session):
+        return
+    params = [{"id": i, "body": index_body(t)} for i, t in rows]
+    if params:
+        table = FTS_TABLES[kind][0]
+        await session.execute(
+            text(f"INSERT OR REPLACE INTO {table}(rowid, body) VALUES (:id, :body)"), params,
+        )
+
+
+async def unindex(session: AsyncSession, kind: str, ids: Iterable[int]) -> None:
+    """删除索引 (不提交)"""
+    if not _enabled(session):
+        return
+    params = [{"id": i} for i in ids]
+    if params:
+        table = FTS_TABLES[kind][0]
+        await session.execute(text(f"DELETE FROM {table} WHERE rowid = :id"), params)
+
+
+def match_expression(query: str) -> Optional[str]:
+    """查询词 -> FTS5 MATCH 表达式：每个词一个短语，词之间为 AND"""
+    phrases = []
+    for term in query.split():
+        tokens = bigram_tokens(term)
+        if not tokens:
+            continue
+        if len(tokens) == 1 and is_cjk(tokens[0]) and len(tokens[0]) == 1:
+            phrases.append(f'"{tokens[0]}"*')  # 单字：匹配以该字开头的二元组
+        else:
+            phrases.append('"' + " ".join(tokens) + '"')
+    return " AND ".join(phrases) or None
+
+
+def _snippet(body: str, terms: list[str]) -> str:
+    """在原文中截取首个命中词附近的片段 (HTML 转义)，命中词以 <b></b> 标出"""
+    lower = body.lower()
+    hits = [(lower.find(t), t) for t in terms if t and lower.find(t) >= 0]
+    if not hits:
+        return html.escape(body[:SNIPPET_RADIUS * 2])
+    pos = min(hits)[0]
+    start = max(pos - SNIPPET_RADIUS, 0)
+    piece = body[start:pos + SNIPPET_RADIUS]
+    pattern = re.compile("|".join(re.escape(t) for _, t in hits), re.IGNORECASE)
+    out, last = [], 0
+    for m in pattern.finditer(piece):
+        out.append(html.escape(piece[last:m.start()]))
+        out.append(f"<b>{html.escape(m.group(0))}</b>")
+        last = m.end()
+    out.append(html.escape(piece[last:]))
+    prefix = "…" if start else ""
+    suffix = "…" if pos + SNIPPET_RADIUS < len(body) else ""
+    return prefix + "".join(out) + suffix
+
+
+def _hit(kind: str, row, rank: float, terms: list[str]) -> SearchHit:
+    if kind == "memo":
+        title, ts = row.title, row.created_at
+    elif kind == "message":
+        title, ts = row.sender, row.received_at
+    else:
+        title, ts = row.title, row.created_at
+    return SearchHit(
+        kind=kind, id=row.id, title=title,
+        snippet=_snippet(document(kind, row), terms),
+        rank=rank, timestamp=ts,
+    )
+
+
+async def search(
+    session: AsyncSession,
+    query: str,
+    kinds: Optional[list[str]] = None,
+    limit: int = 20,
+    user_id: str = DEFAULT_USER,
+) -> list[SearchHit]:
+    """跨备忘录/消息/推送内容检索，按相关度排序"""
+    kinds = [k for k in (kinds or FTS_TABLES) if k in FTS_TABLES]
+    terms = [t.lower() for t in query.split()]
+    expr = match_expression(query)
+    if not expr or not kinds:
+        return []
+
+    hits: list[SearchHit] = []
+    for kind in kinds:
+        table, orm = FTS_TABLES[kind]
+        owned = hasattr(orm, "user_id")
+        if _enabled(session):
+            if owned:
+                sql = (
+                    f"SELECT f.rowid, bm25({table}) AS rank FROM {table} f "
+                    f"JOIN {orm.__tablename__} t ON t.id = f.rowid "
+                    f"WHERE {table} MATCH :q AND t.user_id = :user ORDER BY rank LIMIT :limit"
+                )
+            else:
+                sql = (
+                    f"SELECT rowid, bm25({table}) AS rank FROM {table} "
+                    f"WHERE {table} MATCH :q ORDER BY rank LIMIT :limit"
+                )
+            result = await session.execute(
+                text(sql), {"q": expr, "user": user_id, "limit": limit},
+            )
+            ranks = {r.rowid: r.rank for r in result}
+            if not ranks:
+                continue
+            rows = await session.execute(select(orm).where(orm.id.in_(ranks)))
+            hits += [_hit(kind, r, ranks[r.id], terms) for r in rows.scalars()]
+        else:
+            cols = [c for c in ("title", "sender", "content", "summary") if hasattr(orm, c)]
+            conds = [
+                or_(*(getattr(orm, c).ilike(f"%{t}%") for c in cols)) for t in terms
+            ]
+            if owned:
+                conds.append(orm.user_id == user_id)
+            rows = await session.execute(select(orm).where(*conds).order_by(orm.id.desc()).limit(limit))
+            hits += [_hit(kind, r, 0.0, terms) for r in rows.scalars()]
+    # bm25 越小越相关
+    hits.sort(key=lambda h: h.rank)
+    return hits[:limit]
@@ -0,0 +1,102 @@
+"""烛龙 - 发送者画像
+
+每个发送者一个重要度 (-1 ~ 1)，按指数移动平均学习：
+- 阅读延迟：逐条打开的消息，5 分钟内读 +1，一天后才读 -1，之间按对数插值
+  (批量"全部已读"是清理收件箱，不作为信号)
+- 手动调整优先级：调为紧急 +1、一般 0、常规 -1，学习率更高
+
+画像存 sender_profiles 表，分类时只读有界 LRU 缓存，导入消息不增加查库。
+learn 只改表中的行，调用方提交成功后再 put 进缓存，回滚的学习不会影响分类。
+启动时按最近更新时间预热缓存；缓存未命中视为中性 (0)。
+"""
+import math
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import get_settings
+from database import SenderProfileORM
+from models import MessagePriority
+
+FAST_READ = timedelta(minutes=5)
+SLOW_READ = timedelta(days=1)
+READ_ALPHA = 0.1
+OVERRIDE_ALPHA = 0.5
+OVERRIDE_SIGNAL = {
+    MessagePriority.URGENT: 1.0,
+    MessagePriority.NORMAL: 0.0,
+    MessagePriority.ROUTINE: -1.0,
+}
+
+
+def read_signal(latency: timedelta) -> float:
+    """阅读延迟 -> 信号 (+1 快 ~ -1 慢)"""
+    if latency <= FAST_READ:
+        return 1.0
+    if latency >= SLOW_READ:
+        return -1.0
+    lo, hi = math.log(FAST_READ.total_seconds()), math.log(SLOW_READ.total_seconds())
+    return 1.0 - 2.0 * (math.log(latency.total_seconds()) - lo) / (hi - lo)
+
+
+class SenderProfiles:
+    """发送者 -> 重要度 的有界 LRU 缓存 (学习结果提交后写入)"""
+
+    def __init__(self, capacity: int = 5000):
+        self.capacity = capacity
+        self._cache: OrderedDict[str, float] = OrderedDict()
+
+    def get(self, sender: str) -> Optional[float]:
+        importance = self._cache.get(sender)
+        if importance is not None:
+            self._cache.move_to_end(sender)
+        return importance
+
+    def put(self, sender: str, importance: float) -> None:
+        self._cache[sender] = importance
+        self._cache.move_to_end(sender)
+        while len(self._cache) > self.capacity:
+            self._cache.popitem(last=False)
+
+    async def load(self, session_factory) -> None:
+        """预热：载入最近更新的画像"""
+        async with session_factory() as session:
+            result = await session.execute(
+                select(SenderProfileORM.sender, SenderProfileORM.importance)
+                .order_by(SenderProfileORM.updated_at.desc())
+                .limit(self.capacity)
+            )
+            for sender, importance in reversed(result.all()):
+                self.put(sender, importance)
+
+    async def learn(self, session: AsyncSession, sender: str, signal: float,
+                    alpha: float, override: bool = False) -> float:
+        """按信号更新重要度 (不提交、不写缓存)，返回新值供调用方提交后 put"""
+        profile = await session.get(SenderProfileORM, sender)
+        if profile is None:
+            profile = SenderProfileORM(sender=sender, importance=0.0, reads=0, overrides=0)
+            session.add(profile)
+        profile.importance = round(profile.importance + alpha * (signal - profile.importance), 4)
+        if override:
+            profile.overrides += 1
+        else:
+            profile.reads += 1
+        return profile.importance
+
+    async def learn_read(self, session: AsyncSession, sender: str, received_at: datetime) -> float:
+        return await self.learn(session, sender, read_signal(datetime.utcnow() - received_at), READ_ALPHA)
+
+    async def learn_override(self, session: AsyncSession, sender: str, priority: MessagePriority) -> float:
+        return await self.learn(session, sender, OVERRIDE_SIGNAL[priority], OVERRIDE_ALPHA, override=True)
+
+
+_profiles: Optional[SenderProfiles] = None
+
+
+def get_sender_profiles() -> SenderProfiles:
+    global _profiles
+    if _profiles is None:
+        _profiles = SenderProfiles(get_settings().sender_cache_size)
+    return _profiles
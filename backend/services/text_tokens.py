@@ -0,0 +1,32 @@
+"""烛龙 - 中英文分词 (二元切分)
+
+英文/数字按词，连续汉字按相邻二字切分 (单个汉字保留原样)，按原文顺序输出。
+内容去重 (SimHash 特征) 与全文检索 (FTS5 索引/查询) 共用。
+"""
+import re
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_TOKEN_RE = re.compile(r"[a-z0-9]+|[一-鿿]+")
+
+
+def is_cjk(token: str) -> bool:
+    return "一" <= token[0] <= "鿿"
+
+
+def bigram_tokens(text: str) -> list[str]:
+    """去掉 HTML 标签后切分为词/二元组"""
+    tokens: list[str] = []
+    for run in _TOKEN_RE.findall(_TAG_RE.sub(" ", text or "").lower()):
+        if not is_cjk(run) or len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def trailing_chars(text: str) -> list[str]:
+    """每段连续汉字 (两字及以上) 的末字：二元组只覆盖以各字开头的位置，末字需单独索引"""
+    return [
+        run[-1] for run in _TOKEN_RE.findall(_TAG_RE.sub(" ", text or "").lower())
+        if is_cjk(run) and len(run) > 1
+    ]
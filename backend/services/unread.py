@@ -0,0 +1,76 @@
+"""烛龙 - 未读消息计数
+
+unread_counters 表按 (用户, 优先级) 保存未读数，消息导入、标记已读、删除时在
+同一事务内增减，客户端角标直接读该用户的三行，不必拉取消息列表再计数。
+计数出现偏差时可用 rebuild_unread_counts 按消息表重新统计。
+"""
+from typing import Iterable
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import DEFAULT_USER
+from database import UnreadCounterORM, WeChatMessageORM
+from models import MessagePriority
+
+
+def _upsert(session: AsyncSession, rows: list[dict]):
+    """按方言生成计数累加语句 (不存在的行按增量插入)"""
+    if session.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    stmt = dialect_insert(UnreadCounterORM).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[UnreadCounterORM.user_id, UnreadCounterORM.priority],
+        set_={"count": UnreadCounterORM.count + stmt.excluded.count},
+    )
+
+
+async def adjust_unread(
+    session: AsyncSession, keys: Iterable[tuple[str, str]], sign: int = 1
+) -> None:
+    """按 (用户, 优先级) 增减未读数 (不提交，随调用方事务一起提交)"""
+    deltas: dict[tuple[str, str], int] = {}
+    for key in keys:
+        deltas[key] = deltas.get(key, 0) + sign
+    rows = [{"user_id": u, "priority": p, "count": d} for (u, p), d in deltas.items() if d]
+    if rows:
+        await session.execute(_upsert(session, rows))
+
+
+async def get_unread_counts(session: AsyncSession, user_id: str = DEFAULT_USER) -> dict[str, int]:
+    result = await session.execute(
+        select(UnreadCounterORM.priority, UnreadCounterORM.count)
+        .where(UnreadCounterORM.user_id == user_id)
+    )
+    counts = {p.value: 0 for p in MessagePriority}
+    counts.update({p: c for p, c in result})
+    return counts
+
+
+def rebuild_counts(conn: Connection) -> dict[str, dict[str, int]]:
+    """按消息表重新统计所有用户的未读数并覆盖计数表 (同步，迁移中也会调用)"""
+    rows = conn.execute(
+        select(WeChatMessageORM.user_id, WeChatMessageORM.priority, func.count())
+        .where(WeChatMessageORM.is_read == False)
+        .group_by(WeChatMessageORM.user_id, WeChatMessageORM.priority)
+    )
+    counts: dict[str, dict[str, int]] = {}
+    for user_id, priority, n in rows:
+        counts.setdefault(user_id, {p.value: 0 for p in MessagePriority})[priority] = n
+    conn.execute(delete(UnreadCounterORM))
+    params = [
+        {"user_id": u, "priority": p, "count": c}
+        for u, by_priority in counts.items() for p, c in by_priority.items()
+    ]
+    if params:
+        conn.execute(insert(UnreadCounterORM), params)
+    return counts
+
+
+async def rebuild_unread_counts(session: AsyncSession, user_id: str = DEFAULT_USER) -> dict[str, int]:
+    """修复用：重新统计未读数并提交，返回该用户的计数"""
+    await session.run_sync(lambda s: rebuild_counts(s.connection()))
+    await session.commit()
+    return await get_unread_counts(session, user_id)
@@ -7,12 +7,20 @@
 """
 import re
 from datetime import datetime
-from typing import Optional
-from sqlalchemy import select
+from typing import Iterable, Optional
+from sqlalchemy import select, insert, update, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from config import get_settings, DEFAULT_USER
 from database import WeChatMessageORM
 from models import WeChatMessage, MessagePriority
+from .keyword_matcher import KeywordMatcher
+from .pagination import Cursor
+from .pubsub import get_hub, user_topic
+from .search import index_rows
+from .sender_profile import get_sender_profiles
+from .unread import adjust_unread
+from .write_buffer import get_write_buffer
 
 
 # 紧急关键词
@@ -27,25 +35,63 @@ NORMAL_KEYWORDS = [
 ]
 
 
+_matcher: Optional[KeywordMatcher] = None
+_matcher_sig: tuple = ()
+
+
+def _priority_matcher() -> KeywordMatcher:
+    """分类用匹配器，仅在关键词列表变化时重建"""
+    global _matcher, _matcher_sig
+    sig = (tuple(URGENT_KEYWORDS), tuple(NORMAL_KEYWORDS))
+    if _matcher is None or sig != _matcher_sig:
+        patterns = {kw: MessagePriority.NORMAL for kw in NORMAL_KEYWORDS}
+        patterns.update({kw: MessagePriority.URGENT for kw in URGENT_KEYWORDS})
+        _matcher = KeywordMatcher(patterns)
+        _matcher_sig = sig
+    return _matcher
+
+
+# 关键词得分与分类阈值
+KEYWORD_SCORE = {MessagePriority.URGENT: 2.0, MessagePriority.NORMAL: 1.0}
+URGENT_THRESHOLD = 1.5
+NORMAL_THRESHOLD = 0.5
+
+
 def classify_message(content: str, sender: str = "") -> MessagePriority:
     """
-    根据内容和发送者分类消息优先级
+    根据内容和发送者分类消息优先级：
+    关键词得分 (紧急 2 / 一般 1) + 发送者重要度 × sender_prior_weight
+    发送者重要度只读内存缓存，不查库
     """
-    text = (content + " " + sender).lower()
-    for kw in URGENT_KEYWORDS:
-        if kw in text:
-            return MessagePriority.URGENT
-    for kw in NORMAL_KEYWORDS:
-        if kw in text:
-            return MessagePriority.NORMAL
+    hits = _priority_matcher().match(content + " " + sender).values()
+    score = max((KEYWORD_SCORE[h] for h in hits), default=0.0)
+    importance = get_sender_profiles().get(sender) if sender else None
+    if importance:
+        score += get_settings().sender_prior_weight * importance
+    if score >= URGENT_THRESHOLD:
+        return MessagePriority.URGENT
+    if score >= NORMAL_THRESHOLD:
+        return MessagePriority.NORMAL
     return MessagePriority.ROUTINE
 
 
+def message_from_orm(r: WeChatMessageORM) -> WeChatMessage:
+    return WeChatMessage(
+        id=r.id,
+        sender=r.sender,
+        content=r.content,
+        priority=MessagePriority(r.priority),
+        received_at=r.received_at,
+        is_read=r.is_read,
+    )
+
+
 async def import_message(
     session: AsyncSession,
     sender: str,
     content: str,
-    priority: Optional[MessagePriority] = None
+    priority: Optional[MessagePriority] = None,
+    user_id: str = DEFAULT_USER,
 ) -> WeChatMessage:
     """
     导入一条微信消息并自动分类
@@ -53,63 +99,219 @@ async def import_message(
     """
     if priority is None:
         priority = classify_message(content, sender)
+
+    buffer = get_write_buffer("wechat_messages", _write_messages)
+    if buffer is not None:
+        received_at = datetime.utcnow()
+        result = await buffer.submit({
+            "user_id": user_id, "sender": sender, "content": content,
+            "priority": priority, "received_at": received_at,
+        })
+        item = WeChatMessage(
+            id=result["id"], sender=sender, content=content,
+            priority=priority, received_at=received_at, is_read=False,
+        )
+        publish_message(item, user_id)
+        return item
     
     msg = WeChatMessageORM(
+        user_id=user_id,
         sender=sender,
         content=content,
         priority=priority.value,
     )
     session.add(msg)
+    await session.flush()
+    await index_rows(session, "message", [(msg.id, f"{msg.sender} {msg.content}")])
+    await adjust_unread(session, [(user_id, msg.priority)])
     await session.commit()
     await session.refresh(msg)
-    return WeChatMessage(
-        id=msg.id,
-        sender=msg.sender,
-        content=msg.content,
-        priority=MessagePriority(msg.priority),
-        received_at=msg.received_at,
-        is_read=msg.is_read,
-    )
+    item = message_from_orm(msg)
+    publish_message(item, user_id)
+    return item
+
+
+def publish_message(item: WeChatMessage, user_id: str = DEFAULT_USER) -> None:
+    """推送新消息 (提交后调用)"""
+    get_hub().publish(user_topic(user_id, f"message.{item.priority.value}"), "message", item)
+
+
+def publish_imported(results: list[dict], user_id: str = DEFAULT_USER) -> None:
+    """
+    批量导入提交后按优先级发一条合并通知 (不逐条推送)，
+    客户端收到后重新拉取列表
+    """
+    counts: dict[str, int] = {}
+    for r in results:
+        counts[r["priority"]] = counts.get(r["priority"], 0) + 1
+    hub = get_hub()
+    for priority, count in counts.items():
+        hub.publish(user_topic(user_id, f"message.{priority}"), "refresh", {"count": count}, key="refresh")
+
+
+BULK_CHUNK_SIZE = 500
+
+
+async def import_messages(
+    session: AsyncSession,
+    messages: Iterable[dict],
+    commit: bool = True,
+    chunk_size: int = BULK_CHUNK_SIZE,
+    user_id: str = DEFAULT_USER,
+) -> list[dict]:
+    """
+    批量导入微信消息 (供桥接工具重连后回放积压消息)
+    messages: {sender, content, priority?, received_at?, user_id?} (user_id 缺省为参数 user_id)
+    每 chunk_size 条执行一条 INSERT ... RETURNING，整批只提交一次
+    返回 [{id, priority}]，顺序与输入一致
+    """
+    results: list[dict] = []
+    now = datetime.utcnow()
+    rows: list[dict] = []
+
+    async def flush() -> None:
+        stmt = insert(WeChatMessageORM).returning(
+            WeChatMessageORM.id, WeChatMessageORM.priority,
+            sort_by_parameter_order=True,
+        )
+        result = await session.execute(stmt, rows)
+        ids = [(r.id, r.priority) for r in result]
+        results.extend({"id": i, "priority": p} for i, p in ids)
+        await index_rows(session, "message", [
+            (i, f"{row['sender']} {row['content']}") for (i, _), row in zip(ids, rows)
+        ])
+        await adjust_unread(session, [(row["user_id"], row["priority"]) for row in rows])
+        rows.clear()
+
+    for m in messages:
+        priority = m.get("priority") or classify_message(m["content"], m["sender"])
+        rows.append({
+            "user_id": m.get("user_id") or user_id,
+            "sender": m["sender"],
+            "content": m["content"],
+            "priority": MessagePriority(priority).value,
+            "received_at": m.get("received_at") or now,
+            "is_read": False,
+        })
+        if len(rows) >= chunk_size:
+            await flush()
+    if rows:
+        await flush()
+    if commit:
+        await session.commit()
+    return results
+
+
+async def _write_messages(session: AsyncSession, rows: list[dict]) -> list[dict]:
+    return await import_messages(session, rows, commit=False)
 
 
 async def list_messages(
     session: AsyncSession,
     priority: Optional[MessagePriority] = None,
     unread_only: bool = False,
-    limit: int = 50
+    limit: int = 50,
+    cursor: Optional[Cursor] = None,
+    user_id: str = DEFAULT_USER,
 ) -> list[WeChatMessage]:
-    """获取消息列表"""
-    q = select(WeChatMessageORM).order_by(
-        # 紧急优先，然后按时间
-        WeChatMessageORM.received_at.desc()
+    """获取消息列表 (按 received_at, id 倒序；cursor 为上一页最后一条)"""
+    q = select(WeChatMessageORM).where(WeChatMessageORM.user_id == user_id).order_by(
+        WeChatMessageORM.received_at.desc(),
+        WeChatMessageORM.id.desc(),
     ).limit(limit)
     if priority:
         q = q.where(WeChatMessageORM.priority == priority.value)
     if unread_only:
         q = q.where(WeChatMessageORM.is_read == False)
+    if cursor:
+        q = q.where(tuple_(WeChatMessageORM.received_at, WeChatMessageORM.id) < cursor)
     result = await session.execute(q)
     rows = result.scalars().all()
-    return [
-        WeChatMessage(
-            id=r.id,
-            sender=r.sender,
-            content=r.content,
-            priority=MessagePriority(r.priority),
-            received_at=r.received_at,
-            is_read=r.is_read,
-        )
-        for r in rows
-    ]
+    return [message_from_orm(r) for r in rows]
 
 
-async def mark_read(session: AsyncSession, msg_id: int) -> bool:
-    """标记已读"""
+async def _set_read(session: AsyncSession, *criteria, learn: bool = False) -> list[int]:
+    """未读 -> 已读，同一事务内扣减未读计数 (learn 时按阅读延迟更新发送者画像)"""
     result = await session.execute(
-        select(WeChatMessageORM).where(WeChatMessageORM.id == msg_id)
+        update(WeChatMessageORM)
+        .where(WeChatMessageORM.is_read == False, *criteria)
+        .values(is_read=True)
+        .returning(
+            WeChatMessageORM.id, WeChatMessageORM.user_id, WeChatMessageORM.priority,
+            WeChatMessageORM.sender, WeChatMessageORM.received_at,
+        )
+        .execution_options(synchronize_session=False)
     )
-    msg = result.scalar_one_or_none()
-    if not msg:
-        return False
-    msg.is_read = True
+    rows = result.all()
+    await adjust_unread(session, [(r.user_id, r.priority) for r in rows], sign=-1)
+    profiles = get_sender_profiles()
+    learned: dict[str, float] = {}
+    if learn:
+        for r in rows:
+            if r.sender and r.received_at:
+                learned[r.sender] = await profiles.learn_read(session, r.sender, r.received_at)
+    await session.commit()
+    for sender, importance in learned.items():
+        profiles.put(sender, importance)
+    return [r.id for r in rows]
+
+
+async def mark_read(session: AsyncSession, msg_id: int, user_id: str = DEFAULT_USER) -> bool:
+    """标记已读 (已是已读时同样返回 True)；逐条打开的阅读延迟用于学习发送者重要度"""
+    mine = (WeChatMessageORM.id == msg_id, WeChatMessageORM.user_id == user_id)
+    if await _set_read(session, *mine, learn=True):
+        return True
+    found = await session.execute(select(WeChatMessageORM.id).where(*mine))
+    return found.scalar_one_or_none() is not None
+
+
+async def mark_read_many(
+    session: AsyncSession, msg_ids: Iterable[int], user_id: str = DEFAULT_USER
+) -> list[int]:
+    """批量标记已读，返回本次由未读变为已读的 id"""
+    ids = list(msg_ids)
+    if not ids:
+        return []
+    return await _set_read(
+        session, WeChatMessageORM.id.in_(ids), WeChatMessageORM.user_id == user_id,
+    )
+
+
+async def mark_all_read(
+    session: AsyncSession,
+    priority: Optional[MessagePriority] = None,
+    up_to: Optional[Cursor] = None,
+    user_id: str = DEFAULT_USER,
+) -> list[int]:
+    """
+    全部标记已读 (可限定优先级；up_to 为游标时只处理该位置及更早的消息，
+    不会误标游标之后新到的消息)，返回本次由未读变为已读的 id
+    """
+    criteria = [WeChatMessageORM.user_id == user_id]
+    if priority:
+        criteria.append(WeChatMessageORM.priority == priority.value)
+    if up_to:
+        criteria.append(tuple_(WeChatMessageORM.received_at, WeChatMessageORM.id) <= up_to)
+    return await _set_read(session, *criteria)
+
+
+async def set_priority(
+    session: AsyncSession, msg_id: int, priority: MessagePriority,
+    user_id: str = DEFAULT_USER,
+) -> Optional[WeChatMessage]:
+    """手动调整优先级：同步未读计数，并作为发送者重要度的学习信号"""
+    msg = await session.get(WeChatMessageORM, msg_id)
+    if msg is None or msg.user_id != user_id:
+        return None
+    if msg.priority != priority.value:
+        if not msg.is_read:
+            await adjust_unread(session, [(user_id, msg.priority)], sign=-1)
+            await adjust_unread(session, [(user_id, priority.value)])
+        msg.priority = priority.value
+    importance = None
+    if msg.sender:
+        importance = await get_sender_profiles().learn_override(session, msg.sender, priority)
     await session.commit()
-    return True
+    if importance is not None:
+        get_sender_profiles().put(msg.sender, importance)
+    return message_from_orm(msg)
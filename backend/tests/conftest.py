@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# 与应用一致，以 backend 目录为模块根
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
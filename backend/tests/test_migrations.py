@@ -0,0 +1,79 @@
+"""烛龙 - 迁移测试：从最初版本的表结构升级到最新版本"""
+from sqlalchemy import create_engine, inspect, text
+
+from config import DEFAULT_USER
+from database import Base
+from migrations import LATEST_VERSION, current_version, run_migrations
+
+# 引入版本迁移之前的表结构 (create_all 不会修改已有表)
+BASELINE_SCHEMA = [
+    """CREATE TABLE contents (
+        id INTEGER NOT NULL, title VARCHAR(500) NOT NULL, url VARCHAR(1000) NOT NULL,
+        source VARCHAR(200), summary TEXT, content_type VARCHAR(20),
+        published_at DATETIME, relevance_score FLOAT, created_at DATETIME,
+        PRIMARY KEY (id))""",
+    """CREATE TABLE feedbacks (
+        id INTEGER NOT NULL, content_id INTEGER NOT NULL, score INTEGER NOT NULL,
+        comment TEXT, created_at DATETIME, PRIMARY KEY (id))""",
+    """CREATE TABLE keyword_weights (
+        id INTEGER NOT NULL, keyword VARCHAR(100) NOT NULL, weight FLOAT,
+        updated_at DATETIME, PRIMARY KEY (id), UNIQUE (keyword))""",
+    """CREATE TABLE memos (
+        id INTEGER NOT NULL, title VARCHAR(300) NOT NULL, content TEXT,
+        reminder_at DATETIME, is_completed BOOLEAN, created_at DATETIME,
+        PRIMARY KEY (id))""",
+    """CREATE TABLE wechat_messages (
+        id INTEGER NOT NULL, sender VARCHAR(100) NOT NULL, content TEXT NOT NULL,
+        priority VARCHAR(20), received_at DATETIME, is_read BOOLEAN,
+        PRIMARY KEY (id))""",
+]
+
+BASELINE_ROWS = [
+    "INSERT INTO memos (id, title, content, is_completed) VALUES (1, '周会纪要', '下周三交付', 0)",
+    "INSERT INTO wechat_messages (id, sender, content, priority, is_read) "
+    "VALUES (1, '张三', '明天上午开会', 'important', 0)",
+    "INSERT INTO contents (id, title, url, summary) VALUES (1, '开源模型发布', 'https://example.com/a', '摘要')",
+    "INSERT INTO keyword_weights (keyword, weight) VALUES ('模型', 1.5)",
+    "INSERT INTO feedbacks (content_id, score) VALUES (1, 5)",
+]
+
+
+def _upgrade(engine) -> list[int]:
+    """与 init_db 相同的步骤：建缺失的表，再执行未完成的迁移"""
+    with engine.begin() as conn:
+        Base.metadata.create_all(conn)
+        return run_migrations(conn)
+
+
+def test_upgrade_from_baseline_schema(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'zhulong.db'}")
+    with engine.begin() as conn:
+        for ddl in BASELINE_SCHEMA + BASELINE_ROWS:
+            conn.execute(text(ddl))
+
+    assert _upgrade(engine) == list(range(1, LATEST_VERSION + 1))
+
+    with engine.connect() as conn:
+        assert current_version(conn) == LATEST_VERSION
+        for table in ("memos", "wechat_messages", "feedbacks", "keyword_weights"):
+            cols = {c["name"] for c in inspect(conn).get_columns(table)}
+            assert "user_id" in cols, table
+        assert conn.execute(text("SELECT user_id FROM memos")).scalar() == DEFAULT_USER
+        assert conn.execute(text(
+            "SELECT user_id, weight FROM keyword_weights WHERE keyword = '模型'"
+        )).one() == (DEFAULT_USER, 1.5)
+        assert conn.execute(text(
+            "SELECT count FROM unread_counters WHERE user_id = :u AND priority = 'important'"
+        ), {"u": DEFAULT_USER}).scalar() == 1
+        # 已有数据回填进全文索引 (含单字查询用的末字)
+        for table, term in (("memos_fts", '"纪要"'), ("wechat_messages_fts", '"开会"'),
+                            ("contents_fts", '"发布"'), ("memos_fts", '"付"')):
+            assert conn.execute(text(
+                f"SELECT rowid FROM {table} WHERE {table} MATCH :q"
+            ), {"q": term}).scalar() == 1, (table, term)
+
+
+def test_rerun_is_noop(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'zhulong.db'}")
+    assert _upgrade(engine) == list(range(1, LATEST_VERSION + 1))
+    assert _upgrade(engine) == []
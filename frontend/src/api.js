@@ -11,7 +11,18 @@ const api = axios.create({
   headers: { 'Content-Type': 'application/json' },
 })
 
-// 用户
+// 用户 (多用户模式：请求头 X-User-Id；EventSource 无法设置请求头，改用 user 参数)
+let currentUser = null
+export const setUser = (id) => {
+  currentUser = id
+  if (id) api.defaults.headers.common['X-User-Id'] = id
+  else delete api.defaults.headers.common['X-User-Id']
+}
+const withUser = (qs = '') => {
+  if (!currentUser) return qs
+  const user = `user=${encodeURIComponent(currentUser)}`
+  return qs ? `${qs}&${user}` : user
+}
 export const getUserProfile = () => api.get('/user/profile')
 
 // 信息提炼
@@ -20,18 +31,46 @@ export const submitFeedback = (contentId, score, comment) =>
   api.post(`/contents/${contentId}/feedback`, { content_id: contentId, score, comment })
 
 // 备忘录
-export const getMemos = (includeCompleted = false) =>
-  api.get('/memos', { params: { include_completed: includeCompleted } })
+// 下一页游标在响应头 x-next-cursor 中
+export const getMemos = (includeCompleted = false, cursor) =>
+  api.get('/memos', { params: { include_completed: includeCompleted, cursor } })
 export const getReminders = () => api.get('/memos/reminders')
+// 提醒推送 (SSE)，返回 EventSource，调用方负责 close()
+export const subscribeReminders = (onReminder) => {
+  const qs = withUser()
+  const es = new EventSource(`${baseURL}/memos/reminders/stream${qs ? `?${qs}` : ''}`)
+  es.addEventListener('reminder', (e) => onReminder(JSON.parse(e.data)))
+  return es
+}
 export const addMemo = (data) => api.post('/memos', data)
 export const completeMemo = (id) => api.post(`/memos/${id}/complete`)
 export const deleteMemo = (id) => api.delete(`/memos/${id}`)
+export const completeMemos = (ids) => api.post('/memos/complete', { ids })
+export const deleteMemos = (ids) => api.post('/memos/delete', { ids })
 
 // 微信消息
-export const getWeChatMessages = (priority, unreadOnly) =>
-  api.get('/wechat/messages', { params: { priority, unread_only: unreadOnly } })
+export const getWeChatMessages = (priority, unreadOnly, cursor) =>
+  api.get('/wechat/messages', { params: { priority, unread_only: unreadOnly, cursor } })
 export const addWeChatMessage = (data) => api.post('/wechat/messages', data)
+// 新消息推送 (默认只订阅紧急)；收到 refresh / overflow 时应重新拉取列表
+export const subscribeMessages = (handlers, priorities = ['urgent']) => {
+  const qs = withUser(priorities.map((p) => `priority=${p}`).join('&'))
+  const es = new EventSource(`${baseURL}/wechat/stream?${qs}`)
+  for (const [kind, fn] of Object.entries(handlers)) {
+    es.addEventListener(kind, (e) => fn(JSON.parse(e.data)))
+  }
+  return es
+}
+export const setMessagePriority = (id, priority) =>
+  api.post(`/wechat/messages/${id}/priority`, { priority })
+export const getUnreadCounts = () => api.get('/wechat/unread-counts')
 export const markMessageRead = (id) => api.post(`/wechat/messages/${id}/read`)
+// ids 为空时按 priority / cursor 全部标记
+export const markMessagesRead = ({ ids, priority, cursor } = {}) =>
+  api.post('/wechat/messages/read', { ids, priority, cursor })
+
+// 全文检索 (kind: memo | message | content，可省略)
+export const search = (q, kind) => api.get('/search', { params: { q, kind } })
 
 // 自然语言输入
 export const handleInput = (text, inputType = 'text') =>